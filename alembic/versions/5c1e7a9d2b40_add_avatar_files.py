@@ -0,0 +1,33 @@
+"""add avatar files
+
+Revision ID: 5c1e7a9d2b40
+Revises: 16b923866ab0
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a9d2b40'
+down_revision: Union[str, Sequence[str], None] = '16b923866ab0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('avatar_files',
+    sa.Column('hash', sa.String(length=64), nullable=False, comment='sha256 исходного файла'),
+    sa.Column('ref_count', sa.Integer(), nullable=False, comment='Сколько пользователей используют этот аватар'),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Когда файл был загружен впервые'),
+    sa.PrimaryKeyConstraint('hash')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('avatar_files')
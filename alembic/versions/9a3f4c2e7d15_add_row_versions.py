@@ -0,0 +1,36 @@
+"""add row versions
+
+Revision ID: 9a3f4c2e7d15
+Revises: 5c1e7a9d2b40
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f4c2e7d15'
+down_revision: Union[str, Sequence[str], None] = '5c1e7a9d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rooms', sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Когда комната последний раз изменялась'))
+    op.add_column('rooms', sa.Column('version', sa.Integer(), server_default='1', nullable=False, comment='Версия строки, растет при каждом изменении (для ETag)'))
+    op.add_column('users', sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_index('ix_room_users_room_id', 'room_users', ['room_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_room_users_room_id', table_name='room_users')
+    op.drop_column('users', 'version')
+    op.drop_column('users', 'updated_at')
+    op.drop_column('rooms', 'version')
+    op.drop_column('rooms', 'updated_at')
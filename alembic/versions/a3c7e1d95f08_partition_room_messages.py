@@ -0,0 +1,151 @@
+"""partition room messages by month
+
+Revision ID: a3c7e1d95f08
+Revises: f2b8d6e40a71
+Create Date: 2026-10-19 18:00:00.000000
+
+Переносит room_messages в таблицу, секционированную по месяцам send_at.
+Данные копируются одним INSERT ... SELECT, на время миграции запись в
+чат стоит: запускать в окно обслуживания.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e1d95f08'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d6e40a71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = (
+    "id, user_nickname, room_id, text, original_text, message_type, "
+    "is_filtered, filtered_reason, send_at"
+)
+
+# Триггеры счетчиков room_stats (функции созданы в d41f6a8b2c57)
+STATS_TRIGGERS = (
+    ("room_stats_room_messages_insert", "INSERT", "NEW"),
+    ("room_stats_room_messages_delete", "DELETE", "OLD"),
+)
+
+
+COMMENTS = {
+    "user_nickname": "Имя пользователя",
+    "room_id": "Айди комнаты",
+    "text": "Текст сообщения",
+    "original_text": "Оригинальный текст (до фильтрации)",
+    "message_type": "Тип сообщения: text, system, notification",
+    "is_filtered": "Было ли сообщение отфильтровано",
+    "filtered_reason": "Причина фильтрации",
+    "send_at": "Время отправки сообщения (ключ секционирования)",
+}
+
+
+def _create_stats_triggers() -> None:
+    for name, event, transition in STATS_TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER {name}
+            AFTER {event} ON room_messages
+            REFERENCING {transition} TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {name}();
+        """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("LOCK TABLE room_messages IN EXCLUSIVE MODE")
+    op.execute("ALTER TABLE room_messages RENAME TO room_messages_legacy")
+    op.execute("ALTER INDEX room_messages_pkey RENAME TO room_messages_legacy_pkey")
+    # Иначе имя по умолчанию у ключа новой таблицы станет room_messages_room_id_fkey1
+    op.execute(
+        "ALTER TABLE room_messages_legacy "
+        "RENAME CONSTRAINT room_messages_room_id_fkey TO room_messages_legacy_room_id_fkey"
+    )
+    # Последовательность id переживает старую таблицу: нумерация продолжается
+    op.execute("ALTER SEQUENCE room_messages_id_seq OWNED BY NONE")
+
+    # Ключ секционирования обязан входить в первичный ключ
+    op.execute("""
+        CREATE TABLE room_messages (
+            id integer NOT NULL DEFAULT nextval('room_messages_id_seq'),
+            user_nickname varchar(255) NOT NULL,
+            room_id integer NOT NULL,
+            text text NOT NULL,
+            original_text text NOT NULL,
+            message_type varchar(50) NOT NULL,
+            is_filtered boolean NOT NULL,
+            filtered_reason varchar(500),
+            send_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, send_at),
+            CONSTRAINT room_messages_room_id_fkey FOREIGN KEY (room_id) REFERENCES rooms (id)
+        ) PARTITION BY RANGE (send_at)
+    """)
+    op.execute("ALTER SEQUENCE room_messages_id_seq OWNED BY room_messages.id")
+    for column, comment in COMMENTS.items():
+        op.execute(f"COMMENT ON COLUMN room_messages.{column} IS '{comment}'")
+    op.create_index('ix_room_messages_room_id_id', 'room_messages', ['room_id', 'id'])
+    op.create_index('ix_room_messages_room_id_send_at', 'room_messages', ['room_id', 'send_at'])
+
+    # Секции от самого старого сообщения до трех месяцев вперед, дальше их
+    # заранее создает PartitionManager
+    op.execute("""
+        DO $$
+        DECLARE
+            part_start date := date_trunc(
+                'month', coalesce((SELECT min(send_at) FROM room_messages_legacy), now()) AT TIME ZONE 'UTC'
+            );
+            last_start date := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+        BEGIN
+            WHILE part_start <= last_start LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF room_messages FOR VALUES FROM (%L) TO (%L)',
+                    'room_messages_' || to_char(part_start, 'YYYY_MM'),
+                    part_start::timestamp AT TIME ZONE 'UTC',
+                    (part_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+                );
+                part_start := part_start + interval '1 month';
+            END LOOP;
+        END $$;
+    """)
+
+    # Счетчики room_stats уже учитывают эти сообщения, триггеры вешаем после копирования
+    op.execute(f"INSERT INTO room_messages ({COLUMNS}) SELECT {COLUMNS} FROM room_messages_legacy")
+    op.execute("DROP TABLE room_messages_legacy")
+    _create_stats_triggers()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("LOCK TABLE room_messages IN EXCLUSIVE MODE")
+    op.execute("ALTER SEQUENCE room_messages_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE room_messages RENAME TO room_messages_partitioned")
+    op.execute("ALTER INDEX room_messages_pkey RENAME TO room_messages_partitioned_pkey")
+    op.execute(
+        "ALTER TABLE room_messages_partitioned "
+        "RENAME CONSTRAINT room_messages_room_id_fkey TO room_messages_partitioned_room_id_fkey"
+    )
+
+    op.execute("""
+        CREATE TABLE room_messages (
+            id integer NOT NULL DEFAULT nextval('room_messages_id_seq') PRIMARY KEY,
+            user_nickname varchar(255) NOT NULL,
+            room_id integer NOT NULL,
+            text text NOT NULL,
+            original_text text NOT NULL,
+            message_type varchar(50) NOT NULL,
+            is_filtered boolean NOT NULL,
+            filtered_reason varchar(500),
+            send_at timestamptz NOT NULL,
+            CONSTRAINT room_messages_room_id_fkey FOREIGN KEY (room_id) REFERENCES rooms (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE room_messages_id_seq OWNED BY room_messages.id")
+    op.execute(f"INSERT INTO room_messages ({COLUMNS}) SELECT {COLUMNS} FROM room_messages_partitioned")
+    # Секции удаляются вместе с родительской таблицей
+    op.execute("DROP TABLE room_messages_partitioned")
+    _create_stats_triggers()
@@ -0,0 +1,33 @@
+"""drop room users last seen index
+
+Revision ID: a7d3e5b92c14
+Revises: f6a2c9d41e37
+Create Date: 2026-10-19 23:00:00.000000
+
+f2b8d6e40a71 больше не создает ix_room_users_last_seen: last_seen пакетно
+обновляется у всех активных участников, а индекс по ней делал каждое
+такое обновление не-HOT. Здесь индекс удаляется из баз, где он успел
+появиться; чистильщик проходит room_users по id.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5b92c14'
+down_revision: Union[str, Sequence[str], None] = 'f6a2c9d41e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_room_users_last_seen")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # f2b8d6e40a71 индекс больше не создает - возвращать нечего
+    pass
@@ -0,0 +1,41 @@
+"""room messages default partition
+
+Revision ID: b5f1d8e3a926
+Revises: a7d3e5b92c14
+Create Date: 2026-10-19 23:30:00.000000
+
+DEFAULT-секция room_messages: без нее INSERT сообщения падает, если
+секцию его месяца не успели создать (PARTITIONS_ENABLED=false или
+обслуживание падает дольше premake_months). Строки из нее PartitionManager
+переносит в секцию месяца, когда создает ее.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f1d8e3a926'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e5b92c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE TABLE room_messages_default PARTITION OF room_messages DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Строки без секции своего месяца некуда вернуть - не теряем их молча
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM room_messages_default) THEN
+                RAISE EXCEPTION 'room_messages_default не пуста: сначала создайте секции ее месяцев';
+            END IF;
+        END $$;
+    """)
+    op.execute("DROP TABLE room_messages_default")
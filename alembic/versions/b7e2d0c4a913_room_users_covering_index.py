@@ -0,0 +1,36 @@
+"""room users covering index
+
+Revision ID: b7e2d0c4a913
+Revises: 9a3f4c2e7d15
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d0c4a913'
+down_revision: Union[str, Sequence[str], None] = '9a3f4c2e7d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_room_users_room_id_id',
+        'room_users',
+        ['room_id', 'id'],
+        postgresql_include=['user_nickname'],
+    )
+    # Префикс нового индекса, отдельный больше не нужен
+    op.drop_index('ix_room_users_room_id', table_name='room_users')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_room_users_room_id', 'room_users', ['room_id'])
+    op.drop_index('ix_room_users_room_id_id', table_name='room_users')
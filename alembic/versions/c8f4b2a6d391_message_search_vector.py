@@ -0,0 +1,47 @@
+"""message search vector
+
+Revision ID: c8f4b2a6d391
+Revises: a3c7e1d95f08
+Create Date: 2026-10-19 19:00:00.000000
+
+Добавление STORED-колонки переписывает все секции room_messages:
+запускать в окно обслуживания.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f4b2a6d391'
+down_revision: Union[str, Sequence[str], None] = 'a3c7e1d95f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gin - чтобы room_id и tsvector жили в одном GIN-индексе
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.add_column('room_messages', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('russian', text) || to_tsvector('english', text)", persisted=True),
+        nullable=True,
+        comment='Поисковый вектор текста (русская и английская конфигурации)',
+    ))
+    op.create_index(
+        'ix_room_messages_search',
+        'room_messages',
+        ['room_id', 'search_vector'],
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_room_messages_search', table_name='room_messages')
+    op.drop_column('room_messages', 'search_vector')
@@ -0,0 +1,137 @@
+"""add room stats
+
+Revision ID: d41f6a8b2c57
+Revises: b7e2d0c4a913
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f6a8b2c57'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d0c4a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Триггеры уровня оператора с transition-таблицами: пакетная вставка
+# сообщений обновляет строку счетчиков один раз, а не на каждую строку.
+# Строки room_stats блокируются в порядке room_id, чтобы пакеты по
+# нескольким комнатам не ловили deadlock друг с другом.
+TRIGGERS = {
+    # (таблица, событие, transition-таблица): SET для room_stats
+    ('room_users', 'INSERT', 'NEW'): (
+        "participant_count = s.participant_count + d.n, last_activity_at = now()"
+    ),
+    ('room_users', 'DELETE', 'OLD'): (
+        "participant_count = greatest(s.participant_count - d.n, 0)"
+    ),
+    ('room_messages', 'INSERT', 'NEW'): (
+        "message_count = s.message_count + d.n, "
+        "last_message_id = greatest(s.last_message_id, d.max_id), "
+        "last_activity_at = now()"
+    ),
+    ('room_messages', 'DELETE', 'OLD'): (
+        "message_count = greatest(s.message_count - d.n, 0)"
+    ),
+}
+
+
+def _name(table: str, event: str) -> str:
+    return f"room_stats_{table}_{event.lower()}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('room_stats',
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('participant_count', sa.Integer(), server_default='0', nullable=False, comment='Участников в комнате'),
+    sa.Column('message_count', sa.Integer(), server_default='0', nullable=False, comment='Сообщений в комнате'),
+    sa.Column('last_message_id', sa.Integer(), server_default='0', nullable=False, comment='ID последнего сообщения (0 - сообщений не было)'),
+    sa.Column('last_activity_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Последний вход участника или сообщение'),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('room_id')
+    )
+
+    op.execute("""
+        CREATE FUNCTION room_stats_rooms_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO room_stats (room_id)
+            SELECT id FROM changed_rows
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END $$;
+    """)
+    op.execute("""
+        CREATE TRIGGER room_stats_rooms_insert
+        AFTER INSERT ON rooms
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION room_stats_rooms_insert();
+    """)
+
+    for (table, event, transition), assignments in TRIGGERS.items():
+        name = _name(table, event)
+        op.execute(f"""
+            CREATE FUNCTION {name}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                PERFORM 1 FROM room_stats
+                WHERE room_id IN (SELECT room_id FROM changed_rows)
+                ORDER BY room_id
+                FOR UPDATE;
+
+                UPDATE room_stats AS s
+                SET {assignments}
+                FROM (
+                    SELECT room_id, count(*) AS n, max(id) AS max_id
+                    FROM changed_rows
+                    GROUP BY room_id
+                ) AS d
+                WHERE s.room_id = d.room_id;
+                RETURN NULL;
+            END $$;
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {name}
+            AFTER {event} ON {table}
+            REFERENCING {transition} TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {name}();
+        """)
+
+    # Заполняем счетчики для существующих комнат. Запись блокируется до конца
+    # миграции, иначе изменения между триггером и подсчетом потеряются
+    op.execute("LOCK TABLE rooms, room_users, room_messages IN SHARE MODE")
+    op.execute("""
+        INSERT INTO room_stats (room_id, participant_count, message_count, last_message_id, last_activity_at)
+        SELECT
+            r.id,
+            coalesce(u.n, 0),
+            coalesce(m.n, 0),
+            coalesce(m.max_id, 0),
+            greatest(r.created_at, m.last_at)
+        FROM rooms AS r
+        LEFT JOIN (
+            SELECT room_id, count(*) AS n FROM room_users GROUP BY room_id
+        ) AS u ON u.room_id = r.id
+        LEFT JOIN (
+            SELECT room_id, count(*) AS n, max(id) AS max_id, max(send_at) AS last_at
+            FROM room_messages GROUP BY room_id
+        ) AS m ON m.room_id = r.id
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, event, _ in TRIGGERS:
+        name = _name(table, event)
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {name}()")
+    op.execute("DROP TRIGGER IF EXISTS room_stats_rooms_insert ON rooms")
+    op.execute("DROP FUNCTION IF EXISTS room_stats_rooms_insert()")
+    op.drop_table('room_stats')
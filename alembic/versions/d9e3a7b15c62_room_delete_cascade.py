@@ -0,0 +1,59 @@
+"""room delete cascade
+
+Revision ID: d9e3a7b15c62
+Revises: c8f4b2a6d391
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e3a7b15c62'
+down_revision: Union[str, Sequence[str], None] = 'c8f4b2a6d391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_room_fk(table: str, ondelete: str | None) -> None:
+    # Имя берется из каталога: базы, прошедшие a3c7e1d95f08 до исправления,
+    # получили у room_messages ключ room_messages_room_id_fkey1
+    name = op.get_bind().scalar(sa.text("""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = CAST(:table AS regclass)
+          AND confrelid = CAST('rooms' AS regclass)
+          AND contype = 'f'
+          AND conparentid = 0
+    """), {"table": table})
+    op.drop_constraint(name, table, type_='foreignkey')
+    op.create_foreign_key(
+        f'{table}_room_id_fkey', table, 'rooms', ['room_id'], ['id'], ondelete=ondelete
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Удаление комнаты одним DELETE: участники и сообщения уходят на стороне БД.
+    # Для секционированной room_messages ключ проверяется по всем секциям
+    # (NOT VALID для секционированных таблиц не поддерживается)
+    _replace_room_fk('room_users', 'CASCADE')
+    _replace_room_fk('room_messages', 'CASCADE')
+
+    op.add_column('rooms', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True, comment='Когда комната удалена (сообщения дочищаются в фоне)'))
+    op.create_index(
+        'ix_rooms_deleted_at',
+        'rooms',
+        ['deleted_at'],
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rooms_deleted_at', table_name='rooms')
+    op.drop_column('rooms', 'deleted_at')
+    _replace_room_fk('room_messages', None)
+    _replace_room_fk('room_users', None)
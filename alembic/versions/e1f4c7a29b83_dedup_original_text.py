@@ -0,0 +1,60 @@
+"""dedup original text
+
+Revision ID: e1f4c7a29b83
+Revises: d9e3a7b15c62
+Create Date: 2026-10-19 21:00:00.000000
+
+original_text остается только у сообщений, которые фильтр изменил.
+Пачки коммитятся по отдельности: миграцию можно прервать и запустить
+заново. Место освобождается для новых строк после VACUUM (autovacuum
+сделает это сам); вернуть его ОС может только VACUUM FULL / pg_repack.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f4c7a29b83'
+down_revision: Union[str, Sequence[str], None] = 'd9e3a7b15c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Диапазон id на одну транзакцию
+BATCH_IDS = 50_000
+
+
+def _backfill(condition: str, assignment: str) -> None:
+    conn = op.get_bind()
+    max_id = conn.scalar(sa.text("SELECT coalesce(max(id), 0) FROM room_messages"))
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, BATCH_IDS):
+            conn.execute(
+                sa.text(
+                    f"UPDATE room_messages SET {assignment} "
+                    f"WHERE id >= :start AND id < :stop AND {condition}"
+                ),
+                {"start": start, "stop": start + BATCH_IDS},
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('room_messages', 'original_text',
+               existing_type=sa.Text(),
+               nullable=True,
+               comment='Оригинальный текст, только если фильтр его изменил (иначе совпадает с text)',
+               existing_comment='Оригинальный текст (до фильтрации)')
+    _backfill("original_text = text", "original_text = NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _backfill("original_text IS NULL", "original_text = text")
+    op.alter_column('room_messages', 'original_text',
+               existing_type=sa.Text(),
+               nullable=False,
+               comment='Оригинальный текст (до фильтрации)',
+               existing_comment='Оригинальный текст, только если фильтр его изменил (иначе совпадает с text)')
@@ -0,0 +1,28 @@
+"""rooms owner index
+
+Revision ID: e5a9c3f17b20
+Revises: d41f6a8b2c57
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c3f17b20'
+down_revision: Union[str, Sequence[str], None] = 'd41f6a8b2c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_rooms_user_id_id', 'rooms', ['user_id', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rooms_user_id_id', table_name='rooms')
@@ -0,0 +1,30 @@
+"""room users last seen
+
+Revision ID: f2b8d6e40a71
+Revises: e5a9c3f17b20
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d6e40a71'
+down_revision: Union[str, Sequence[str], None] = 'e5a9c3f17b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('room_users', sa.Column('last_seen', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Последняя активность участника (поллинг, сообщения, websocket)'))
+    op.create_index('ix_room_users_token', 'room_users', ['token'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_room_users_token', table_name='room_users')
+    op.drop_column('room_users', 'last_seen')
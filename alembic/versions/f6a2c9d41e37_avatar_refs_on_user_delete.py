@@ -0,0 +1,75 @@
+"""avatar refs on user delete
+
+Revision ID: f6a2c9d41e37
+Revises: e1f4c7a29b83
+Create Date: 2026-10-19 22:00:00.000000
+
+Удаление пользователя уменьшает счетчик ссылок его аватара. Файлы с
+нулевым счетчиком удаляет чистильщик (Reaper.purge_avatars).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2c9d41e37'
+down_revision: Union[str, Sequence[str], None] = 'e1f4c7a29b83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Хеш из ссылки на набор копий (см. avatar_hash_from_path)
+AVATAR_HASH = r"substring(avatar from '^/static/avatars/([0-9a-f]{64})$')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Строки avatar_files блокируются в порядке hash, как и room_stats
+    op.execute(f"""
+        CREATE FUNCTION avatar_files_users_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM 1 FROM avatar_files
+            WHERE hash IN (SELECT {AVATAR_HASH} FROM changed_rows)
+            ORDER BY hash
+            FOR UPDATE;
+
+            UPDATE avatar_files AS f
+            SET ref_count = greatest(f.ref_count - d.n, 0)
+            FROM (
+                SELECT {AVATAR_HASH} AS hash, count(*) AS n
+                FROM changed_rows
+                GROUP BY 1
+            ) AS d
+            WHERE f.hash = d.hash;
+            RETURN NULL;
+        END $$;
+    """)
+    op.execute("""
+        CREATE TRIGGER avatar_files_users_delete
+        AFTER DELETE ON users
+        REFERENCING OLD TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION avatar_files_users_delete();
+    """)
+
+    # Счетчики, завышенные удалениями до триггера, пересчитываются по users
+    op.execute("LOCK TABLE users, avatar_files IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(f"""
+        UPDATE avatar_files AS f
+        SET ref_count = coalesce(u.n, 0)
+        FROM avatar_files AS a
+        LEFT JOIN (
+            SELECT {AVATAR_HASH} AS hash, count(*) AS n
+            FROM users
+            GROUP BY 1
+        ) AS u ON u.hash = a.hash
+        WHERE f.hash = a.hash AND f.ref_count <> coalesce(u.n, 0)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER avatar_files_users_delete ON users")
+    op.execute("DROP FUNCTION avatar_files_users_delete()")
@@ -1,25 +1,72 @@
 from typing import Annotated, AsyncIterable
-from fastapi import Cookie, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import Cookie, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from app.config import settings
-from app.models.users import User
-from jose import jwt
-
-
-engine = create_async_engine(settings.postgres.build_dsn())
+from app.services.replicas import replica_router
+from app.services.room_access import RoomAccess, room_access_cache
+from app.services.user_cache import UserSnapshot, user_cache
+from app.utils.auth import decode_token
+from app.utils.pool import InstrumentedPool
+from jose import JWTError
+
+
+engine = create_async_engine(
+    settings.postgres.build_dsn(),
+    poolclass=InstrumentedPool,
+    **settings.postgres.engine_options(),
+)
 session_maker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 
 async def get_db() -> AsyncIterable[AsyncSession]:
+    """
+    Сессия primary. Для записи и для чтения, которое должно видеть только
+    что сделанные изменения (read-your-writes), а также для всего, что
+    кладется в in-process кеши.
+    """
     async with session_maker() as session:
         yield session
 
 
-async def get_current_user_from_token(
+def read_session_maker() -> async_sessionmaker:
+    """
+    Фабрика read-only сессий: реплика, если есть здоровая, иначе primary.
+    Данные могут отставать на replica_max_lag_seconds.
+    """
+    return replica_router.choose() or session_maker
+
+
+async def get_read_db() -> AsyncIterable[AsyncSession]:
+    """Read-only сессия, см. read_session_maker"""
+    async with read_session_maker()() as session:
+        yield session
+
+
+_NOT_DECODED = object()
+
+
+async def get_token_claims(
+    request: Request,
     access_token: str | None = Cookie(None, include_in_schema=False),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+) -> dict | None:
+    """Claims access токена; за один запрос токен декодируется не больше одного раза"""
+    claims = getattr(request.state, "token_claims", _NOT_DECODED)
+    if claims is not _NOT_DECODED:
+        return claims
+
+    claims = None
+    if access_token:
+        try:
+            claims = decode_token(access_token)
+        except JWTError:
+            claims = None
+
+    request.state.token_claims = claims
+    return claims
+
+
+def user_id_from_claims(access_token: str | None, claims: dict | None) -> int:
+    """Достает id пользователя из claims валидного access токена"""
     if not access_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,43 +74,90 @@ async def get_current_user_from_token(
         )
 
     try:
-        payload = jwt.decode(
-            access_token,
-            settings.auth.secret_key.get_secret_value(),
-            algorithms=[settings.auth.algorithm],
-        )
-
-        user_id = payload.get("sub")
+        user_id = claims.get("sub")
         if user_id is None:
             raise HTTPException("Invalid token")
 
-        # 3. Получение пользователя из БД
-        stmt = select(User).where(User.id == int(user_id))
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
+        return int(user_id)
 
-        if not user:
-            raise HTTPException("Invalid token")
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
 
-        return user
 
-    except Exception:
+async def get_current_user_from_token(
+    access_token: str | None = Cookie(None, include_in_schema=False),
+    claims: dict | None = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_db),
+) -> UserSnapshot:
+    user_id = user_id_from_claims(access_token, claims)
+
+    # Получение пользователя из кеша или из БД
+    user = await user_cache.get(db, user_id)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
 
+    return user
+
+
+async def get_current_user_id(
+    access_token: str | None = Cookie(None, include_in_schema=False),
+    claims: dict | None = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_db),
+) -> int:
+    """Для эндпоинтов, которым нужен только id пользователя"""
+    if settings.auth.trust_token_claims:
+        return user_id_from_claims(access_token, claims)
+
+    user = await get_current_user_from_token(
+        access_token=access_token, claims=claims, db=db
+    )
+    return user.id
+
 
 async def get_current_user_optional(
     access_token: str | None = Cookie(None, include_in_schema=False),
+    claims: dict | None = Depends(get_token_claims),
     db: AsyncSession = Depends(get_db),
-) -> User | None:
+) -> UserSnapshot | None:
+    if claims is None:
+        return None
+
     try:
-        return await get_current_user_from_token(access_token=access_token, db=db)
+        return await get_current_user_from_token(
+            access_token=access_token, claims=claims, db=db
+        )
     except Exception:
         return None
 
 
+async def get_room_access(
+    room_code: str,
+    token_room: str | None = Cookie(None, include_in_schema=False),
+    db: AsyncSession = Depends(get_db),
+) -> RoomAccess:
+    """Проверка, что пользователь находится в комнате room_code"""
+    access = None
+    if token_room:
+        access = await room_access_cache.get(db, token_room, room_code)
+        # При промахе кеша SELECT открыл транзакцию. Сессия закроется только
+        # после ответа, и без commit поллинг держал бы соединение primary
+        # "idle in transaction" все 30-60 секунд ожидания
+        await db.commit()
+
+    if not access:
+        raise HTTPException(status_code=403, detail="You are not in this room")
+
+    return access
+
+
 # Type Alias для аннотаций
-CurrentUser = Annotated[User, Depends(get_current_user_from_token)]
-CurrentUserOptional = Annotated[User | None, Depends(get_current_user_optional)]
+CurrentUser = Annotated[UserSnapshot, Depends(get_current_user_from_token)]
+CurrentUserId = Annotated[int, Depends(get_current_user_id)]
+CurrentUserOptional = Annotated[UserSnapshot | None, Depends(get_current_user_optional)]
+CurrentRoomAccess = Annotated[RoomAccess, Depends(get_room_access)]
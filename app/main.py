@@ -1,8 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from app.config import settings
+from app.dependencies import engine, session_maker
 from app.routers import router
+from app.services.avatars import AVATARS_DIR, MULTIPART_OVERHEAD_BYTES
+from app.services.message_ingester import message_ingester
+from app.services.partitions import partition_manager
+from app.services.presence import presence_tracker
+from app.services.reaper import reaper
+from app.services.replicas import replica_router
+from app.services.room_cache import room_cache
+from app.utils.http import BodySizeLimitMiddleware
+from app.utils.serialization import FastJSONResponse
+from app.utils.static import ImmutableStaticFiles
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Фоновые задачи воркера"""
+    tasks = []
+    if settings.cache.cross_worker_invalidation:
+        tasks.append(asyncio.create_task(room_cache.listen_invalidations()))
+    if settings.ingest.enabled:
+        tasks.append(asyncio.create_task(message_ingester.run(session_maker)))
+    if replica_router.replicas:
+        tasks.append(asyncio.create_task(replica_router.run_health_checks()))
+    if settings.partitions.enabled:
+        tasks.append(asyncio.create_task(partition_manager.run(engine)))
+    if settings.maintenance.enabled:
+        tasks.append(asyncio.create_task(presence_tracker.run(session_maker)))
+        tasks.append(asyncio.create_task(reaper.run(session_maker)))
+
+    yield
+
+    if settings.ingest.enabled:
+        # Принятые сообщения, которые еще ждут в очереди, не теряем
+        await message_ingester.drain(session_maker)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
 
 # Создание приложения
 app = FastAPI(
@@ -10,6 +51,14 @@ app = FastAPI(
     description="API для веб-приложения онлайн-конференций",
     version="1.0.0",
     docs_url="/docs",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
+
+# Размер загрузки проверяется до разбора multipart (запас - на заголовки частей)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/users/avatar": settings.media.avatar_max_bytes + MULTIPART_OVERHEAD_BYTES},
 )
 
 # CORS middleware
@@ -33,4 +82,9 @@ app.add_middleware(
 app.include_router(router)
 
 STATIC_DIR = Path(__file__).parent.parent / "static"
+
+# Аватары адресуются хешем содержимого - кешируются клиентом навсегда.
+# Монтируется раньше /static, иначе запросы заберет общий StaticFiles
+AVATARS_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/static/avatars", ImmutableStaticFiles(directory=AVATARS_DIR), name="avatars")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -3,5 +3,7 @@ from .users import User
 from .room_users import RoomUsers
 from .room import Room
 from .room_messages import RoomMessages
+from .avatar_files import AvatarFile
+from .room_stats import RoomStats
 
-__all__ = ["Base", "User", "Room", "RoomUsers", "RoomMessages"]
+__all__ = ["Base", "User", "Room", "RoomUsers", "RoomMessages", "AvatarFile", "RoomStats"]
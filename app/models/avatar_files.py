@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import TIMESTAMP, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class AvatarFile(Base):
+    """Набор копий аватара, адресуемый хешем содержимого"""
+
+    __tablename__ = "avatar_files"
+
+    hash: Mapped[str] = mapped_column(
+        String(64), primary_key=True, comment="sha256 исходного файла"
+    )
+    ref_count: Mapped[int] = mapped_column(
+        Integer, default=0, comment="Сколько пользователей используют этот аватар"
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        comment="Когда файл был загружен впервые",
+    )
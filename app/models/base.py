@@ -1,3 +1,24 @@
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import event
+from sqlalchemy.orm import declarative_base, object_session
 
 Base = declarative_base()
+
+
+def versioned(cls):
+    """
+    version растет на 1 при каждом ORM UPDATE строки (для ETag).
+
+    Не version_id_col: с ним flush проверяет старую версию и падает
+    StaleDataError, если строку между загрузкой и flush изменил Core
+    UPDATE (чистильщик, фоновое удаление комнаты) или другой запрос.
+    Здесь увеличение выполняет сама БД (version = version + 1), а новое
+    значение возвращается RETURNING'ом (eager_defaults в __mapper_args__).
+    """
+
+    @event.listens_for(cls, "before_update")
+    def _bump_version(mapper, connection, target):
+        # Изменились только коллекции - UPDATE самой строки не будет
+        if object_session(target).is_modified(target, include_collections=False):
+            target.version = cls.version + 1
+
+    return cls
@@ -1,17 +1,28 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import TIMESTAMP, Integer, String, Boolean, ForeignKey, func, Text
+from sqlalchemy import TIMESTAMP, Index, Integer, String, Boolean, ForeignKey, func, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.room_users import RoomUsers
-from .base import Base
+from .base import Base, versioned
 
 if TYPE_CHECKING:
     from app.models.users import User
     from app.models.room_messages import RoomMessages
 
+@versioned
 class Room(Base):
     __tablename__ = "rooms"
+    __table_args__ = (
+        # Список комнат владельца по страницам (от новых к старым)
+        Index("ix_rooms_user_id_id", "user_id", "id"),
+        # Фоновая очистка удаленных комнат
+        Index(
+            "ix_rooms_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), comment="Имя комнаты")
@@ -32,6 +43,22 @@ class Room(Base):
         server_default=func.now(),
         comment="Когда комната была создана",
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        comment="Когда комната последний раз изменялась",
+    )
+    version: Mapped[int] = mapped_column(
+        Integer,
+        server_default="1",
+        comment="Версия строки, растет при каждом изменении (для ETag)",
+    )
+    deleted_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=True,
+        comment="Когда комната удалена (сообщения дочищаются в фоне)",
+    )
     # Исправлено: правильный тип для Text поля
     banned_words: Mapped[str] = mapped_column(
         Text,
@@ -39,15 +66,20 @@ class Room(Base):
         comment="JSON список запрещенных слов для фильтрации"
     )
 
+    __mapper_args__ = {"eager_defaults": True}
+
     user: Mapped["User"] = relationship("User", back_populates="rooms", lazy="selectin")
     room_users: Mapped[list["RoomUsers"]] = relationship(
         "RoomUsers",
         back_populates="room",
         lazy="selectin",
         cascade="all, delete-orphan",
+        # Участников и сообщения удаляет ON DELETE CASCADE, а не ORM по строке
+        passive_deletes=True,
     )
     room_messages: Mapped[list["RoomMessages"]] = relationship(
-        "RoomMessages", 
+        "RoomMessages",
         back_populates="room",
-        lazy="selectin"
+        lazy="select",
+        passive_deletes=True,
     )
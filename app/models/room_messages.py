@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import Integer, String, ForeignKey, TIMESTAMP, Text, Boolean
+from sqlalchemy import Computed, Index, Integer, Sequence, String, ForeignKey, TIMESTAMP, Text, Boolean, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -13,17 +15,35 @@ class RoomMessages(Base):
     """Сообщения в комнате"""
 
     __tablename__ = "room_messages"
+    # Таблица секционирована по месяцам send_at (см. миграцию a3c7e1d95f08),
+    # секции создает и удаляет PartitionManager; сообщения без секции своего
+    # месяца попадают в room_messages_default (b5f1d8e3a926)
+    __table_args__ = (
+        Index("ix_room_messages_room_id_id", "room_id", "id"),
+        Index("ix_room_messages_room_id_send_at", "room_id", "send_at"),
+        # Полнотекстовый поиск внутри комнаты (нужно расширение btree_gin)
+        Index(
+            "ix_room_messages_search", "room_id", "search_vector", postgresql_using="gin"
+        ),
+        {"postgresql_partition_by": "RANGE (send_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(
+        Integer, Sequence("room_messages_id_seq"), primary_key=True, autoincrement=True
+    )
     user_nickname: Mapped[str] = mapped_column(String(255), comment="Имя пользователя")
     
     room_id: Mapped[int] = mapped_column(
         Integer,
-        ForeignKey("rooms.id"),
+        ForeignKey("rooms.id", ondelete="CASCADE"),
         comment="Айди комнаты",
     )
     text: Mapped[str] = mapped_column(Text, comment="Текст сообщения")
-    original_text: Mapped[str] = mapped_column(Text, comment="Оригинальный текст (до фильтрации)")
+    original_text: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+        comment="Оригинальный текст, только если фильтр его изменил (иначе совпадает с text)",
+    )
     
     message_type: Mapped[str] = mapped_column(
         String(50), default="text", comment="Тип сообщения: text, system, notification"
@@ -37,12 +57,32 @@ class RoomMessages(Base):
         String(500), nullable=True, comment="Причина фильтрации"
     )
     
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('russian', text) || to_tsvector('english', text)", persisted=True
+        ),
+        deferred=True,
+        comment="Поисковый вектор текста (русская и английская конфигурации)",
+    )
+
     send_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
-        default=datetime.utcnow,
-        comment="Время отправки сообщения"
+        primary_key=True,
+        server_default=func.now(),
+        comment="Время отправки сообщения (ключ секционирования)"
     )
 
+    @hybrid_property
+    def unfiltered_text(self) -> str:
+        """Текст до фильтрации - и на объекте, и в запросах (coalesce)"""
+        return self.original_text if self.original_text is not None else self.text
+
+    @unfiltered_text.inplace.expression
+    @classmethod
+    def _unfiltered_text_expression(cls):
+        return func.coalesce(cls.original_text, cls.text)
+
     room: Mapped["Room"] = relationship(
         "Room", back_populates="room_messages", lazy="selectin"
     )
\ No newline at end of file
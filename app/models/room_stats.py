@@ -0,0 +1,33 @@
+from datetime import datetime
+from sqlalchemy import TIMESTAMP, ForeignKey, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class RoomStats(Base):
+    """
+    Счетчики комнаты. Ведутся триггерами БД в той же транзакции, что и
+    вход/выход участника или отправка/удаление сообщения, приложение их
+    только читает.
+    """
+
+    __tablename__ = "room_stats"
+
+    room_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True
+    )
+    participant_count: Mapped[int] = mapped_column(
+        Integer, server_default="0", comment="Участников в комнате"
+    )
+    message_count: Mapped[int] = mapped_column(
+        Integer, server_default="0", comment="Сообщений в комнате"
+    )
+    last_message_id: Mapped[int] = mapped_column(
+        Integer, server_default="0", comment="ID последнего сообщения (0 - сообщений не было)"
+    )
+    last_activity_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        comment="Последний вход участника или сообщение",
+    )
@@ -1,5 +1,6 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import Integer, String, ForeignKey
+from sqlalchemy import TIMESTAMP, Index, Integer, String, ForeignKey, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -12,6 +13,20 @@ class RoomUsers(Base):
     """Участники подключенные к комнате"""
 
     __tablename__ = "room_users"
+    __table_args__ = (
+        # Покрывающий индекс: список участников по страницам и count
+        # отвечаются index-only scan'ом, без чтения таблицы
+        Index(
+            "ix_room_users_room_id_id",
+            "room_id",
+            "id",
+            postgresql_include=["user_nickname"],
+        ),
+        # Поиск участника по cookie token_room и пакетное обновление last_seen
+        Index("ix_room_users_token", "token"),
+        # Индекса по last_seen нет: колонку пакетно обновляет presence,
+        # индекс отключил бы HOT-обновления (чистильщик идет по id)
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_nickname: Mapped[str] = mapped_column(String(255), comment="Имя пользователя")
@@ -20,9 +35,14 @@ class RoomUsers(Base):
     )
     room_id: Mapped[int] = mapped_column(
         Integer,
-        ForeignKey("rooms.id"),
+        ForeignKey("rooms.id", ondelete="CASCADE"),
         comment="Айди комнаты к которой подключен пользователь",
     )
+    last_seen: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        comment="Последняя активность участника (поллинг, сообщения, websocket)",
+    )
 
     room: Mapped["Room"] = relationship(
         "Room", back_populates="room_users", lazy="selectin"
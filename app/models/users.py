@@ -3,13 +3,14 @@ from sqlalchemy import TIMESTAMP, Integer, String, func
 from typing import TYPE_CHECKING
 
 
-from .base import Base
+from .base import Base, versioned
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
     from app.models.room import Room
 
 
+@versioned
 class User(Base):
     """Модель пользователя"""
 
@@ -28,6 +29,15 @@ class User(Base):
         TIMESTAMP(timezone=True),
         server_default=func.now(),
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    version: Mapped[int] = mapped_column(Integer, server_default="1")
+
+    __mapper_args__ = {"eager_defaults": True}
+
     rooms: Mapped[list["Room"]] = relationship(
-        "Room", back_populates="user", lazy="selectin", cascade="all, delete-orphan"
+        "Room", back_populates="user", lazy="select", cascade="all, delete-orphan"
     )
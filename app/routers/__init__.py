@@ -3,6 +3,7 @@ from .users import router as users_router
 from .rooms import router as rooms_router
 from .auth import router as auth_routers
 from .websocket import router as websocket_router
+from .internal import router as internal_router
 
 router = APIRouter(prefix="")
 
@@ -10,3 +11,4 @@ router.include_router(auth_routers)
 router.include_router(users_router)
 router.include_router(rooms_router)
 router.include_router(websocket_router)
+router.include_router(internal_router)
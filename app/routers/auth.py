@@ -6,8 +6,8 @@ from app.dependencies import get_db
 from app.models.users import User
 from app.schemas.auth import RegisterRequest, LoginRequest
 from app.utils.auth import (
-    hash_password,
-    verify_password,
+    ahash_password,
+    averify_and_update,
     create_access_token,
     create_refresh_token,
 )
@@ -50,9 +50,18 @@ async def login(
     result = await db.execute(select(User).where(User.nickname == data.nickname))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(data.password, user.password_hash):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    is_valid, new_hash = await averify_and_update(data.password, user.password_hash)
+    if not is_valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Параметры argon2 изменились - прозрачно перехешируем пароль
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
     access_token = create_access_token({"sub": str(user.id)})
     refresh_token = create_refresh_token({"sub": str(user.id)})
     set_auth_cookies(response, access_token, refresh_token)
@@ -69,7 +78,7 @@ async def register(
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="User already exists")
 
-    user = User(nickname=data.nickname, password_hash=hash_password(data.password))
+    user = User(nickname=data.nickname, password_hash=await ahash_password(data.password))
     db.add(user)
     await db.commit()
     await db.refresh(user)
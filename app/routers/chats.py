@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query,Request
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from app.dependencies import get_db, CurrentUserOptional
+from app.dependencies import get_db, CurrentRoomAccess, CurrentUserOptional
 from app.models.room import Room
 from app.models.room_users import RoomUsers
 from app.models.room_messages import RoomMessages
@@ -19,38 +19,15 @@ from app.routers.rooms import router
 )
 async def get_room_messages(
     room_code: str,
-    request: Request,
+    room: CurrentRoomAccess,
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=1000, description="Лимит сообщений"),
     offset: int = Query(0, ge=0, description="Смещение")
 ):
-    # Проверяем что пользователь уже в комнате
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == request.cookies.get("token_room"),
-            Room.code == room_code
-        )
-    )
-    room_user_exists = result.scalar_one_or_none()
-
-    if not room_user_exists:
-        raise HTTPException(status_code=403, detail="You are not in this room")
-
-    # Получаем комнату
-    result = await db.execute(
-        select(Room).where(Room.code == room_code)
-    )
-    room = result.scalar_one_or_none()
-
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
     # Получаем сообщения с пагинацией
     result = await db.execute(
         select(RoomMessages)
-        .where(RoomMessages.room_id == room.id)
+        .where(RoomMessages.room_id == room.room_id)
         .order_by(desc(RoomMessages.send_at))
         .limit(limit)
         .offset(offset)
@@ -69,39 +46,16 @@ async def get_room_messages(
 async def create_room_message(
     room_code: str,
     data: RoomMessageCreate,
-    request: Request,
+    room: CurrentRoomAccess,
     db: AsyncSession = Depends(get_db)
 ):
-    # Проверяем что пользователь уже в комнате
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == request.cookies.get("token_room"),
-            Room.code == room_code
-        )
-    )
-    room_user = result.scalar_one_or_none()
-
-    if not room_user:
-        raise HTTPException(status_code=403, detail="You are not in this room")
-
-    # Получаем комнату
-    result = await db.execute(
-        select(Room).where(Room.code == room_code)
-    )
-    room = result.scalar_one_or_none()
-
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
     if not room.is_active:
         raise HTTPException(status_code=403, detail="Room is closed")
 
     # Создаем сообщение
     message = RoomMessages(
-        user_nickname=room_user.user_nickname,
-        room_id=room.id,
+        user_nickname=room.user_nickname,
+        room_id=room.room_id,
         text=data.text,
         send_at=datetime.utcnow()
     )
@@ -0,0 +1,56 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.config import settings
+from app.dependencies import engine
+from app.services.message_ingester import message_ingester
+from app.services.partitions import partition_manager
+from app.services.presence import presence_tracker
+from app.services.reaper import reaper
+from app.services.replicas import replica_router
+from app.services.room_access import room_access_cache
+from app.services.room_cache import room_cache
+from app.services.room_stats import room_stats_cache
+from app.services.user_cache import user_cache
+from app.utils.auth import token_cache_stats
+
+
+def require_internal_token(
+    x_internal_token: str | None = Header(None, include_in_schema=False),
+) -> None:
+    """
+    Метрики раскрывают DSN реплик, ошибки БД и состояние кешей - только
+    для мониторинга с токеном. Без настроенного токена эндпоинтов нет
+    """
+    expected = settings.auth.internal_token
+    if expected is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_internal_token is None or not secrets.compare_digest(
+        x_internal_token.encode(), expected.get_secret_value().encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid internal token")
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/metrics", description="Метрики пула соединений, in-process кешей и фоновых задач")
+async def get_metrics():
+    return {
+        "db_pool": engine.pool.stats(),
+        "db_replicas": replica_router.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache_stats(),
+        "room_access_cache": room_access_cache.stats(),
+        "room_cache": room_cache.stats(),
+        "room_stats_cache": room_stats_cache.stats(),
+        "presence": presence_tracker.stats(),
+        "message_ingester": message_ingester.stats(),
+        "reaper": reaper.stats(),
+        "partitions": partition_manager.stats(),
+    }
@@ -1,40 +1,102 @@
 import secrets
 import json
 import asyncio
+from typing import Literal
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
-from sqlalchemy import select, desc, func
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, or_, select, desc, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import lazyload, selectinload
 from datetime import datetime, timedelta
 
-from app.dependencies import CurrentUser, get_db, CurrentUserOptional
+from app.dependencies import CurrentRoomAccess, CurrentUserId, get_db, get_read_db, read_session_maker, session_maker, CurrentUserOptional
 from app.models.room import Room
 from app.models.room_users import RoomUsers
 from app.models.room_messages import RoomMessages
-from app.schemas.room import RoomCreate, RoomJoinResponse, RoomResponse, RoomJoin, RoomWithUsersResponse, RoomUpdate, RoomWithBannedWordsResponse
-from app.schemas.room_messages import RoomMessageCreate, RoomMessageResponse, PollingResponse
-from app.services.message_filter import message_filter
+from app.models.room_stats import RoomStats
+from app.schemas.room import RoomCreate, RoomJoinResponse, RoomResponse, RoomJoin, RoomUser, RoomWithUsersResponse, RoomSettingsUpdate, RoomWithBannedWordsResponse, RoomWithStatsResponse, RoomPage, RoomUserPage
+from app.schemas.room_messages import MESSAGE_FIELDS, RoomMessageBatchCreate, RoomMessageBatchResponse, RoomMessageCreate, RoomMessageResponse, RoomMessageSearchResponse, PollingResponse
+from app.services.message_export import MEDIA_TYPES, ExportFormat, stream_messages
+from app.services.message_filter import message_filter, original_text_to_store
+from app.services.message_ingester import MESSAGE_COLUMNS, insert_messages, message_ingester
+from app.services.message_search import make_cursor, search_messages_query
 from app.services.notification_service import notification_service
+from app.services.room_access import room_access_cache
+from app.services.room_cache import parse_banned_words, room_cache
+from app.services.partitions import hot_window_start
+from app.services.presence import presence_tracker
+from app.services.room_stats import room_stats_cache
+from app.utils.http import (
+    PRIVATE_REVALIDATE,
+    PUBLIC_REVALIDATE,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CountResponse, split_page
+from app.utils.serialization import FastJSONResponse, rows_to_dicts
 import shortuuid
 from app.config import settings
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
+
 @router.get(
-    "", response_model=list[RoomResponse], description="Получение списка моих комнат"
+    "", response_model=RoomPage, description="Получение списка моих комнат"
 )
-async def get_rooms(current_user: CurrentUser, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Room).where(Room.user_id == current_user.id, Room.is_active)
+async def get_rooms(
+    current_user_id: CurrentUserId,
+    after: int | None = Query(None, ge=0, description="next_after из предыдущей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    status: Literal["active", "closed", "all"] = Query("active", description="Фильтр по активности комнаты"),
+    scheduled: bool | None = Query(None, description="Только с предстоящей встречей (true) или без нее (false)"),
+    db: AsyncSession = Depends(get_db),
+):
+    # Один запрос: комнаты владельца и их счетчики из room_stats, без загрузки
+    # участников и сообщений. Страницы идут от новых комнат к старым по
+    # индексу (user_id, id)
+    query = (
+        select(
+            Room.id,
+            Room.name,
+            Room.code,
+            Room.user_id,
+            Room.is_active,
+            Room.schedule,
+            Room.created_at,
+            func.coalesce(RoomStats.participant_count, 0).label("participant_count"),
+            func.coalesce(RoomStats.message_count, 0).label("message_count"),
+            RoomStats.last_activity_at,
+        )
+        .outerjoin(RoomStats, RoomStats.room_id == Room.id)
+        .where(Room.user_id == current_user_id, Room.deleted_at.is_(None))
+        .order_by(Room.id.desc())
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(Room.id < after)
+    if status != "all":
+        query = query.where(Room.is_active == (status == "active"))
+    if scheduled is True:
+        query = query.where(Room.schedule > func.now())
+    elif scheduled is False:
+        query = query.where(or_(Room.schedule.is_(None), Room.schedule <= func.now()))
+
+    result = await db.execute(query)
+    rows, has_more = split_page(result.mappings().all(), limit)
+    return RoomPage(
+        items=[RoomWithStatsResponse.model_validate(row) for row in rows],
+        next_after=rows[-1]["id"] if has_more else None,
     )
-    return result.scalars().all()
 
 
 @router.post(
     "", response_model=RoomResponse, description="Создание комнаты с уникальной ссылкой"
 )
 async def create_room(
-    data: RoomCreate, current_user: CurrentUser, db: AsyncSession = Depends(get_db)
+    data: RoomCreate, current_user_id: CurrentUserId, db: AsyncSession = Depends(get_db)
 ):
     room_code = shortuuid.uuid()[:12]
     room_code = f"{room_code[:3]}-{room_code[3:6]}-{room_code[6:9]}".lower()
@@ -42,9 +104,9 @@ async def create_room(
     room = Room(
         name=data.name,
         code=room_code, 
-        user_id=current_user.id, 
+        user_id=current_user_id, 
         schedule=data.schedule,
-        banned_words=data.banned_words  # Пустой список запрещенных слов по умолчанию
+        banned_words=json.dumps(data.banned_words or [])  # Пустой список запрещенных слов по умолчанию
     )
 
     db.add(room)
@@ -59,33 +121,37 @@ async def create_room(
     description="Получение комнаты по уникальному room_code",
 )
 async def get_room_by_code(
-    room_code: str, request: Request, db: AsyncSession = Depends(get_db)
+    room_code: str,
+    request: Request,
+    response: Response,
+    access: CurrentRoomAccess,
+    db: AsyncSession = Depends(get_db),
 ):
-    # Проверяем что пользователь уже в комнате
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == request.cookies.get("token_room"),
-            Room.code == room_code
-        )
+    # Доступ и сама комната уже проверены зависимостью. Состав участников
+    # описывают count и max(id): вход увеличивает max(id), выход уменьшает count
+    count_result = await db.execute(
+        select(func.count(RoomUsers.id), func.max(RoomUsers.id))
+        .where(RoomUsers.room_id == access.room_id)
     )
-    room_user_exists = result.scalar_one_or_none()
-
-    if not room_user_exists:
-        raise HTTPException(status_code=403, detail="You not login in a room")
+    user_count, last_user_id = count_result.one()
+    etag = make_etag("room", access.room_id, access.room.version, user_count, last_user_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
+    set_cache_headers(response, etag, PRIVATE_REVALIDATE)
 
     result = await db.execute(
-        select(Room)
-        .where(Room.code == room_code)
-        .options(selectinload(Room.room_users))
+        select(RoomUsers.user_nickname).where(RoomUsers.room_id == access.room_id)
     )
-    room = result.scalar_one_or_none()
-
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
 
-    return room
+    return RoomWithUsersResponse(
+        id=access.room_id,
+        code=access.room_code,
+        user_id=access.owner_id,
+        is_active=access.is_active,
+        schedule=access.schedule,
+        created_at=access.created_at,
+        room_users=[RoomUser(user_nickname=nickname) for nickname in result.scalars()],
+    )
 
 
 @router.post(
@@ -101,18 +167,16 @@ async def join_room(
     db: AsyncSession = Depends(get_db),
 ):
     # Проверяем что пользователь уже в комнате
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == request.cookies.get("token_room"),
-            Room.code == data.code
-        )
-    )
-    room_user_exists = result.scalar_one_or_none()
+    token_room = request.cookies.get("token_room")
+    room_user_exists = None
+    if token_room:
+        room_user_exists = await room_access_cache.get(db, token_room, data.code)
 
     if room_user_exists:
-        await db.delete(room_user_exists)
+        await db.execute(
+            delete(RoomUsers).where(RoomUsers.id == room_user_exists.room_user_id)
+        )
+        room_stats_cache.invalidate(room_user_exists.room_id)
 
     if current_user:
         nickname = current_user.nickname
@@ -121,8 +185,7 @@ async def join_room(
     else:
         raise HTTPException(status_code=400, detail="Nickname is required")
 
-    result = await db.execute(select(Room).where(Room.code == data.code))
-    room = result.scalar_one_or_none()
+    room = await room_cache.get(db, data.code)
 
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -138,7 +201,11 @@ async def join_room(
 
     db.add(room_user)
     await db.commit()
-    
+    room_stats_cache.invalidate(room.id)
+    if room_user_exists:
+        # Прежняя запись участника удалена вместе с этим commit
+        await room_access_cache.invalidate_user(db, room_user_exists.token, data.code)
+
     # Отправляем уведомление о присоединении
     notification_service.add_notification(room.id, {
         "type": "user_joined",
@@ -193,31 +260,119 @@ async def leave_room(request: Request, db: AsyncSession = Depends(get_db)):
 
     await db.delete(room_user)
     await db.commit()
+    await room_access_cache.invalidate_user(db, token_room, room_user.room.code)
+    room_stats_cache.invalidate(room_user.room_id)
     return {"ok": True}
 
 
 @router.delete("/{room_id}", description="Удаление комнаты (только создатель)")
 async def delete_room(
-    room_id: int, current_user: CurrentUser, db: AsyncSession = Depends(get_db)
+    room_id: int,
+    current_user_id: CurrentUserId,
+    background: bool = Query(False, description="Пометить комнату удаленной, а сообщения удалить в фоне"),
+    db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Room).where(Room.id == room_id))
-    room = result.scalar_one_or_none()
+    # Без загрузки ORM-объекта: его связи потянули бы всех участников
+    result = await db.execute(
+        select(Room.user_id, Room.code, RoomStats.message_count)
+        .outerjoin(RoomStats, RoomStats.room_id == Room.id)
+        .where(Room.id == room_id, Room.deleted_at.is_(None))
+    )
+    room = result.first()
 
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    if room.user_id != current_user.id:
+    if room.user_id != current_user_id:
         raise HTTPException(
             status_code=403, detail="You are not the owner of this room"
         )
 
-    await db.delete(room)
+    background = background or (
+        (room.message_count or 0) > settings.maintenance.room_delete_sync_max_messages
+    )
+    if background:
+        # Комната пропадает сразу, сообщения пачками удалит Reaper.purge_deleted_rooms
+        await db.execute(
+            update(Room)
+            .where(Room.id == room_id)
+            .values(deleted_at=func.now(), is_active=False, version=Room.version + 1, updated_at=func.now())
+        )
+        await db.execute(delete(RoomUsers).where(RoomUsers.room_id == room_id))
+    else:
+        # Участники, сообщения и счетчики удаляются ON DELETE CASCADE
+        await db.execute(delete(Room).where(Room.id == room_id))
     await db.commit()
-    return {"ok": True}
+    await room_cache.invalidate(db, room.code)
+    room_stats_cache.invalidate(room_id)
+    return {"ok": True, "background": background}
 
 
 # ===== НОВЫЕ ЭНДПОИНТЫ ДЛЯ СООБЩЕНИЙ =====
 
+# Запас на случай, когда id и send_at идут не в одном порядке (send_at -
+# время начала транзакции): проверка "клиент внутри окна" берет окно уже
+CATCH_UP_MARGIN = timedelta(hours=1)
+
+
+def new_messages_query(room_id: int, last_message_id: int):
+    """
+    Новые сообщения для поллинга. Окно по send_at оставляет в плане только
+    последние секции room_messages (проверяется benchmarks/partition_pruning.py);
+    более старая история доступна через GET /{room_code}/messages.
+    """
+    return (
+        select(*MESSAGE_COLUMNS)
+        .where(
+            RoomMessages.room_id == room_id,
+            RoomMessages.id > last_message_id,
+            RoomMessages.send_at >= hot_window_start(),
+        )
+        .order_by(RoomMessages.id.asc())
+    )
+
+
+def hot_window_first_id_query(room_id: int):
+    """Первое сообщение комнаты в окне (с запасом CATCH_UP_MARGIN); тоже только горячие секции"""
+    return (
+        select(RoomMessages.id)
+        .where(
+            RoomMessages.room_id == room_id,
+            RoomMessages.send_at >= hot_window_start() + CATCH_UP_MARGIN,
+        )
+        .order_by(RoomMessages.send_at.asc())
+        .limit(1)
+    )
+
+
+def catch_up_messages_query(room_id: int, last_message_id: int, limit: int):
+    """Новые сообщения без окна - для клиента, который вернулся позже hot_window_hours"""
+    return (
+        select(*MESSAGE_COLUMNS)
+        .where(RoomMessages.room_id == room_id, RoomMessages.id > last_message_id)
+        .order_by(RoomMessages.id.asc())
+        .limit(limit + 1)
+    )
+
+
+async def fetch_new_messages(db: AsyncSession, room_id: int, last_message_id: int) -> tuple[list[dict], bool]:
+    """
+    Новые сообщения и has_more. Обычно клиент поллит постоянно и его
+    last_message_id внутри окна - хватает горячих секций. Если он старше
+    окна, сообщения между ним и окном читаются по всем секциям страницами
+    по MAX_PAGE_SIZE. last_message_id=0 - клиент без истории, ему только окно.
+    """
+    if last_message_id:
+        window_first_id = await db.scalar(hot_window_first_id_query(room_id))
+        if window_first_id is None or last_message_id < window_first_id:
+            result = await db.execute(catch_up_messages_query(room_id, last_message_id, MAX_PAGE_SIZE))
+            rows, has_more = split_page(result.all(), MAX_PAGE_SIZE)
+            return rows_to_dicts(MESSAGE_FIELDS, rows), has_more
+
+    result = await db.execute(new_messages_query(room_id, last_message_id))
+    return rows_to_dicts(MESSAGE_FIELDS, result), False
+
+
 @router.get(
     "/{room_code}/poll",
     response_model=PollingResponse,
@@ -225,44 +380,32 @@ async def delete_room(
 )
 async def poll_messages(
     room_code: str,
-    request: Request,
+    access: CurrentRoomAccess,
     last_message_id: int = Query(0, description="ID последнего полученного сообщения"),
     timeout: int = Query(30, ge=5, le=60, description="Таймаут ожидания (секунды)"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Проверяем доступ к комнате
-    token_room = request.cookies.get("token_room")
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == token_room,
-            Room.code == room_code
-        )
-    )
-    room_user = result.scalar_one_or_none()
-
-    if not room_user:
-        raise HTTPException(status_code=403, detail="You are not in this room")
-
-    room_id = room_user.room_id
+    room_id = access.room_id
     start_time = datetime.utcnow()
     
     # Подписываем пользователя на уведомления
-    notification_service.subscribe_user(room_id, token_room)
+    notification_service.subscribe_user(room_id, access.token)
+    # last_seen обновит фоновая задача, здесь только отметка в памяти
+    presence_tracker.touch(access.token)
 
     # Проверяем наличие новых данных с интервалами
     while (datetime.utcnow() - start_time).seconds < timeout:
-        # Получаем новые сообщения
-        result = await db.execute(
-            select(RoomMessages)
-            .where(
-                RoomMessages.room_id == room_id,
-                RoomMessages.id > last_message_id
-            )
-            .order_by(RoomMessages.id.asc())
-        )
-        new_messages = result.scalars().all()
+        # Счетчики комнаты (из памяти или одной строкой room_stats) говорят,
+        # есть ли вообще новые сообщения - без запроса к room_messages.
+        # Общий кеш заполняется только из primary: отстающая реплика оставила
+        # бы в нем старый last_message_id для всех поллеров на ttl. Сессия
+        # берет соединение лишь при промахе и сразу его отдает
+        async with session_maker() as primary:
+            counters = await room_stats_cache.get(primary, room_id)
+
+        new_messages, has_more = [], False
+        if counters.last_message_id > last_message_id:
+            new_messages, has_more = await fetch_new_messages(db, room_id, last_message_id)
 
         # Получаем уведомления с момента последней проверки
         notifications = notification_service.get_pending_notifications(
@@ -271,20 +414,19 @@ async def poll_messages(
 
         # Если есть новые данные - возвращаем сразу
         if new_messages or notifications:
-            # Получаем количество пользователей в комнате
-            user_count_result = await db.execute(
-                select(func.count(RoomUsers.id))
-                .where(RoomUsers.room_id == room_id)
-            )
-            user_count = user_count_result.scalar() or 0
-
-            return PollingResponse(
-                messages=[RoomMessageResponse.from_orm(msg) for msg in new_messages],
-                notifications=notifications,
-                user_count=user_count,
-                last_message_id=new_messages[-1].id if new_messages else last_message_id,
-                has_more=False
-            )
+            # Строки из БД уже соответствуют схеме - отдаем их без повторной
+            # валидации через response_model
+            return FastJSONResponse({
+                "messages": new_messages,
+                "notifications": notifications,
+                "user_count": counters.participant_count,
+                "last_message_id": new_messages[-1]["id"] if new_messages else last_message_id,
+                "has_more": has_more,
+            })
+
+        # Закрываем транзакцию, чтобы на время ожидания соединение вернулось
+        # в пул: иначе каждый поллинг держит его до 60 секунд
+        await db.commit()
 
         # Ждем 1 секунду перед следующей проверкой
         await asyncio.sleep(1)
@@ -307,73 +449,149 @@ async def poll_messages(
 async def create_message(
     room_code: str,
     message_data: RoomMessageCreate,
-    request: Request,
+    room: CurrentRoomAccess,
     db: AsyncSession = Depends(get_db)
 ):
-    # Проверяем доступ к комнате
-    token_room = request.cookies.get("token_room")
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == token_room,
-            Room.code == room_code
-        )
-        .options(selectinload(RoomUsers.room))
-    )
-    room_user = result.scalar_one_or_none()
-
-    if not room_user:
-        raise HTTPException(status_code=403, detail="You are not in this room")
-
-    room = room_user.room
-    
     if not room.is_active:
         raise HTTPException(status_code=403, detail="Room is closed")
 
-    # Получаем запрещенные слова комнаты
-    # banned_words = []
-    # if room.banned_words:
-    #     try:
-    #         banned_words = json.loads(room.banned_words)
-    #     except:
-    #         banned_words = []
-
-    # Фильтруем сообщение
+    # Фильтруем сообщение (запрещенные слова уже разобраны в кеше комнат)
     filter_result = message_filter.filter_message(
         message_data.text, 
-        room.banned_words
+        list(room.banned_words)
     )
 
     # Создаем сообщение
-    message = RoomMessages(
-        user_nickname=room_user.user_nickname,
-        room_id=room.id,
-        text=filter_result["filtered_text"],
-        original_text=filter_result["original_text"],
-        message_type=message_data.message_type,
-        is_filtered=not filter_result["is_clean"],
-        filtered_reason=filter_result["filtered_reason"]
-    )
-
-    db.add(message)
-    await db.commit()
-    await db.refresh(message)
+    values = {
+        "user_nickname": room.user_nickname,
+        "room_id": room.room_id,
+        "text": filter_result["filtered_text"],
+        "original_text": original_text_to_store(filter_result),
+        "message_type": message_data.message_type,
+        "is_filtered": not filter_result["is_clean"],
+        "filtered_reason": filter_result["filtered_reason"],
+    }
+
+    if settings.ingest.enabled:
+        # Сохранится вместе с соседними сообщениями одной транзакцией
+        message = await message_ingester.submit(values)
+    else:
+        # INSERT ... RETURNING вместо add/commit/refresh: без лишнего SELECT
+        (message,) = await insert_messages(db, [values])
+        await db.commit()
+    room_stats_cache.invalidate(room.room_id)
+    presence_tracker.touch(room.token)
 
     # Обновляем последний ID сообщения для уведомлений
-    notification_service.update_last_message_id(room.id, message.id)
+    notification_service.update_last_message_id(room.room_id, message["id"])
 
     # Если сообщение было отфильтровано - отправляем уведомление
-    if message.is_filtered:
-        notification_service.add_notification(room.id, {
+    if message["is_filtered"]:
+        notification_service.add_notification(room.room_id, {
             "type": "message_filtered",
-            "user_nickname": room_user.user_nickname,
-            "message": f"Сообщение от {room_user.user_nickname} было отфильтровано",
+            "user_nickname": room.user_nickname,
+            "message": f"Сообщение от {room.user_nickname} было отфильтровано",
             "reason": filter_result["filtered_reason"],
             "timestamp": datetime.utcnow().isoformat()
         })
 
-    return RoomMessageResponse.from_orm(message)
+    return FastJSONResponse(message)
+
+
+@router.post(
+    "/{room_code}/messages/batch",
+    response_model=RoomMessageBatchResponse,
+    description="Пакетная отправка сообщений (боты, импорт переписки)"
+)
+async def create_messages_batch(
+    room_code: str,
+    data: RoomMessageBatchCreate,
+    room: CurrentRoomAccess,
+    db: AsyncSession = Depends(get_db)
+):
+    # Доступ проверен один раз на весь пакет
+    if not room.is_active:
+        raise HTTPException(status_code=403, detail="Room is closed")
+
+    banned_words = list(room.banned_words)
+    results: list[dict] = []
+    values: list[dict] = []
+    positions: list[int] = []
+    filtered_count = 0
+
+    for index, item in enumerate(data.messages):
+        # Те же проверки, что у одиночного сообщения, но ошибка - только у этого элемента
+        try:
+            message_data = RoomMessageCreate.model_validate(item.model_dump())
+        except ValidationError as e:
+            results.append({"index": index, "ok": False, "error": e.errors()[0]["msg"]})
+            continue
+
+        # Выражение для запрещенных слов комнаты компилируется один раз и берется из кеша
+        filter_result = message_filter.filter_message(message_data.text, banned_words)
+        is_filtered = not filter_result["is_clean"]
+        filtered_count += is_filtered
+        values.append({
+            "user_nickname": room.user_nickname,
+            "room_id": room.room_id,
+            "text": filter_result["filtered_text"],
+            "original_text": original_text_to_store(filter_result),
+            "message_type": message_data.message_type,
+            "is_filtered": is_filtered,
+            "filtered_reason": filter_result["filtered_reason"],
+        })
+        positions.append(index)
+        results.append(None)
+
+    if values:
+        # Один многострочный INSERT ... RETURNING и один commit на весь пакет
+        rows = await insert_messages(db, values)
+        await db.commit()
+        for index, row in zip(positions, rows):
+            results[index] = {"index": index, "ok": True, "message": row}
+
+        # Поллеров будим один раз на пакет
+        room_stats_cache.invalidate(room.room_id)
+        presence_tracker.touch(room.token)
+        notification_service.update_last_message_id(room.room_id, rows[-1]["id"])
+        if filtered_count:
+            notification_service.add_notification(room.room_id, {
+                "type": "message_filtered",
+                "user_nickname": room.user_nickname,
+                "message": f"{filtered_count} сообщений от {room.user_nickname} было отфильтровано",
+                "reason": "Пакетная отправка",
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+    return FastJSONResponse({
+        "results": results,
+        "saved": len(values),
+        "failed": len(results) - len(values),
+    })
+
+
+@router.get(
+    "/{room_code}/messages/search",
+    response_model=RoomMessageSearchResponse,
+    description="Полнотекстовый поиск по истории сообщений комнаты"
+)
+async def search_room_messages(
+    room_code: str,
+    access: CurrentRoomAccess,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос (синтаксис websearch: \"фраза\", -исключить, or)"),
+    cursor: str | None = Query(None, description="next_cursor из предыдущей страницы"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(
+        search_messages_query(access.room_id, q, cursor, limit)
+    )
+    rows, has_more = split_page(result.mappings().all(), limit)
+
+    return FastJSONResponse({
+        "items": [dict(row) for row in rows],
+        "next_cursor": make_cursor(rows[-1]["rank"], rows[-1]["id"]) if has_more else None,
+    })
 
 
 @router.get(
@@ -383,37 +601,59 @@ async def create_message(
 )
 async def get_room_messages(
     room_code: str,
-    request: Request,
+    access: CurrentRoomAccess,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Проверяем доступ к комнате
-    token_room = request.cookies.get("token_room")
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == token_room,
-            Room.code == room_code
-        )
-    )
-    room_user = result.scalar_one_or_none()
-
-    if not room_user:
-        raise HTTPException(status_code=403, detail="You are not in this room")
-
     # Получаем сообщения
     result = await db.execute(
-        select(RoomMessages)
-        .where(RoomMessages.room_id == room_user.room_id)
+        select(*MESSAGE_COLUMNS)
+        .where(RoomMessages.room_id == access.room_id)
         .order_by(desc(RoomMessages.send_at))
         .limit(limit)
         .offset(offset)
     )
-    
-    messages = result.scalars().all()
-    return messages
+
+    return FastJSONResponse(rows_to_dicts(MESSAGE_FIELDS, result))
+
+
+@router.get(
+    "/{room_code}/export",
+    response_class=StreamingResponse,
+    description="Выгрузка всей истории сообщений комнаты в NDJSON или CSV (только создатель)"
+)
+async def export_room_messages(
+    room_code: str,
+    request: Request,
+    current_user_id: CurrentUserId,
+    format: ExportFormat = Query("ndjson", description="Формат: ndjson (строка JSON на сообщение) или csv"),
+    since: datetime | None = Query(None, description="Только сообщения, отправленные позже этого момента"),
+    db: AsyncSession = Depends(get_db)
+):
+    room = await room_cache.get(db, room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if room.owner_id != current_user_id:
+        raise HTTPException(status_code=403, detail="You are not the owner of this room")
+    # Сессия зависимостей закроется только после отправки ответа: без commit
+    # соединение primary простояло бы "idle in transaction" всю выгрузку
+    await db.commit()
+
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{room.code}.{format}"',
+        "Cache-Control": "private, no-store",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_messages(read_session_maker(), room.id, since, format, compress),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
 
 
 @router.put(
@@ -423,16 +663,19 @@ async def get_room_messages(
 )
 async def update_room_settings(
     room_code: str,
-    settings: RoomUpdate,
-    current_user: CurrentUser,
+    settings: RoomSettingsUpdate,
+    current_user_id: CurrentUserId,
     db: AsyncSession = Depends(get_db)
 ):
-    # Получаем комнату
+    # Получаем комнату (без участников и сообщений)
     result = await db.execute(
-        select(Room).where(
+        select(Room)
+        .where(
             Room.code == room_code,
-            Room.user_id == current_user.id
+            Room.user_id == current_user_id,
+            Room.deleted_at.is_(None)
         )
+        .options(lazyload("*"))
     )
     room = result.scalar_one_or_none()
 
@@ -448,21 +691,13 @@ async def update_room_settings(
         room.is_active = settings.is_active
 
     await db.commit()
-    await db.refresh(room)
-
-    # Парсим banned_words для ответа
-    banned_words_list = []
-    if room.banned_words:
-        try:
-            banned_words_list = json.loads(room.banned_words)
-        except:
-            banned_words_list = []
+    await room_cache.invalidate(db, room.code)
 
     return RoomWithBannedWordsResponse(
         id=room.id,
         code=room.code,
         is_active=room.is_active,
-        banned_words=banned_words_list,
+        banned_words=list(parse_banned_words(room.banned_words)),
         created_at=room.created_at
     )
 
@@ -474,59 +709,63 @@ async def update_room_settings(
 )
 async def get_room_settings(
     room_code: str,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(Room).where(Room.code == room_code)
-    )
-    room = result.scalar_one_or_none()
+    # Отдается из кеша комнат, в БД идем только при промахе
+    room = await room_cache.get(db, room_code)
 
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    # Парсим banned_words для ответа
-    banned_words_list = []
-    if room.banned_words:
-        try:
-            banned_words_list = json.loads(room.banned_words)
-        except:
-            banned_words_list = []
+    etag = make_etag("room-settings", room.id, room.version)
+    if etag_matches(request, etag):
+        return not_modified(etag, PUBLIC_REVALIDATE)
+    set_cache_headers(response, etag, PUBLIC_REVALIDATE)
 
     return RoomWithBannedWordsResponse(
         id=room.id,
         code=room.code,
         is_active=room.is_active,
-        banned_words=banned_words_list,
+        banned_words=list(room.banned_words),
         created_at=room.created_at
     )
 
 
-@router.get("/{room_code}/users", description="Получение списка пользователей в комнате")
+@router.get(
+    "/{room_code}/users",
+    response_model=RoomUserPage | CountResponse,
+    description="Получение списка пользователей в комнате",
+)
 async def get_room_users(
     room_code: str,
-    request: Request,
-    db: AsyncSession = Depends(get_db)
+    access: CurrentRoomAccess,
+    after: int | None = Query(None, ge=0, description="next_after из предыдущей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    count_only: bool = Query(False, description="Вернуть только количество участников"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Проверяем доступ к комнате
-    token_room = request.cookies.get("token_room")
-    result = await db.execute(
-        select(RoomUsers)
-        .join(Room, Room.id == RoomUsers.room_id)
-        .where(
-            RoomUsers.token == token_room,
-            Room.code == room_code
-        )
+    if count_only:
+        # Количество - из счетчиков комнаты. Кеш счетчиков общий,
+        # заполняется только из primary (см. poll_messages)
+        async with session_maker() as primary:
+            counters = await room_stats_cache.get(primary, access.room_id)
+        return CountResponse(count=counters.participant_count)
+
+    # Страница участников отвечается покрывающим индексом (room_id, id) INCLUDE (user_nickname)
+    query = (
+        select(RoomUsers.id, RoomUsers.user_nickname)
+        .where(RoomUsers.room_id == access.room_id)
+        .order_by(RoomUsers.id)
+        .limit(limit + 1)
     )
-    room_user = result.scalar_one_or_none()
-
-    if not room_user:
-        raise HTTPException(status_code=403, detail="You are not in this room")
-
-    # Получаем всех пользователей комнаты
-    result = await db.execute(
-        select(RoomUsers.user_nickname)
-        .where(RoomUsers.room_id == room_user.room_id)
+    if after is not None:
+        query = query.where(RoomUsers.id > after)
+    result = await db.execute(query)
+    rows, has_more = split_page(result.all(), limit)
+
+    return RoomUserPage(
+        items=[nickname for _, nickname in rows],
+        next_after=rows[-1].id if has_more else None,
     )
-    users = result.scalars().all()
-
-    return {"users": list(users), "user_count": len(users)}
@@ -1,19 +1,73 @@
-from pathlib import Path
-import uuid
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import CurrentUser, get_db
+from sqlalchemy.orm import noload
+from app.dependencies import CurrentUser, get_db, get_read_db
 from app.models.users import User
-from app.schemas.user import UserCreate, UserResponse
+from app.schemas.user import UserCreate, UserPage, UserResponse
+from app.services.avatars import set_user_avatar
+from app.services.user_cache import user_cache
+from app.utils.auth import ahash_password
+from app.utils.http import (
+    PUBLIC_REVALIDATE,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    CountResponse,
+    split_page,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Только то, что уходит в UserResponse (без password_hash и комнат)
+PROFILE_COLUMNS = (User.id, User.nickname, User.avatar, User.created_at)
 
-@router.get("", response_model=list[UserResponse])
-async def get_users(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User))
-    return result.scalars().all()
+
+@router.get("", response_model=UserPage | CountResponse)
+async def get_users(
+    request: Request,
+    response: Response,
+    after: int | None = Query(None, ge=0, description="id последнего пользователя предыдущей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    count_only: bool = Query(False, description="Вернуть только количество пользователей"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if count_only:
+        # Отвечается index-only scan'ом по первичному ключу
+        count = await db.scalar(select(func.count()).select_from(User))
+        return CountResponse(count=count)
+
+    # Сначала дешевая проба: состав страницы описывают count и max(id)
+    # (вход/удаление), изменения строк - sum(version). Для 304 страница
+    # целиком не читается
+    window = select(User.id, User.version).order_by(User.id).limit(limit + 1)
+    if after is not None:
+        window = window.where(User.id > after)
+    window = window.subquery()
+    probe = await db.execute(
+        select(func.count(), func.max(window.c.id), func.sum(window.c.version))
+    )
+    etag = make_etag("users", after or 0, limit, *probe.one())
+    if etag_matches(request, etag):
+        return not_modified(etag, PUBLIC_REVALIDATE)
+    set_cache_headers(response, etag, PUBLIC_REVALIDATE)
+
+    # Keyset-пагинация по id: страница стоит одинаково и в начале, и в конце списка
+    query = select(*PROFILE_COLUMNS).order_by(User.id).limit(limit + 1)
+    if after is not None:
+        query = query.where(User.id > after)
+    result = await db.execute(query)
+    rows, has_more = split_page(result.mappings().all(), limit)
+
+    return UserPage(
+        items=[UserResponse.model_validate(row) for row in rows],
+        next_after=rows[-1]["id"] if has_more else None,
+    )
 
 
 @router.get("/me", response_model=UserResponse)
@@ -22,9 +76,24 @@ async def get_me_user(current_user: CurrentUser, db: AsyncSession = Depends(get_
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+async def get_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Сначала только версия строки: для 304 больше ничего не нужно
+    version = await db.scalar(select(User.version).where(User.id == user_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    etag = make_etag("user", user_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag, PUBLIC_REVALIDATE)
+    set_cache_headers(response, etag, PUBLIC_REVALIDATE)
+
+    result = await db.execute(select(*PROFILE_COLUMNS).where(User.id == user_id))
+    user = result.mappings().one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -42,10 +111,11 @@ async def update_user(
     if data.nickname:
         user.nickname = data.nickname
     if data.password:
-        user.password_hash = data.password
+        user.password_hash = await ahash_password(data.password)
 
     await db.commit()
     await db.refresh(user)
+    user_cache.invalidate(user.id)
     return user
 
 
@@ -55,36 +125,16 @@ async def update_avatar(
     avatar: UploadFile = File(..., description="Аватар"),
     db: AsyncSession = Depends(get_db),
 ):
-    STATIC_DIR = Path(__file__).resolve().parent.parent.parent / "static"
-    AVATARS_DIR = STATIC_DIR / "avatars"
-    
-    # Создаём папку, если её нет
-    AVATARS_DIR.mkdir(parents=True, exist_ok=True)
-    
-    file_ext = Path(avatar.filename).suffix.lower()
-    
-    if file_ext not in {".jpg", ".jpeg", ".png", ".webp"}:
-        raise HTTPException(status_code=400, detail="Недопустимый формат файла")
-    
-    # Генерируем уникальное имя файла
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = AVATARS_DIR / unique_filename
-    
-    # Удаляем старый аватар, если есть
-    if current_user.avatar:
-        old_avatar_path = AVATARS_DIR / Path(current_user.avatar).name
-        if old_avatar_path.exists():
-            old_avatar_path.unlink()
-    
-    # Сохраняем новый файл
-    contents = await avatar.read()
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # Обновляем путь в БД
-    current_user.avatar = f"/static/avatars/{unique_filename}"
-    
+    # current_user - снимок из кеша, грузим саму строку
+    user = await db.get(User, current_user.id, options=[noload(User.rooms)])
+    if user is None:
+        # Удален после того, как попал в кеш
+        raise HTTPException(status_code=404, detail="User not found")
+    # Не держим транзакцию открытой на время загрузки и нарезки копий
     await db.commit()
-    await db.refresh(current_user)
+
+    # Поток на диск + нарезка копий в пуле процессов, event loop не блокируется
+    await set_user_avatar(db, user, avatar)
+    user_cache.invalidate(user.id)
     
-    return current_user
+    return user
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from fastapi import APIRouter, Cookie, WebSocket, WebSocketDisconnect, Query
 from typing import Dict, Optional
 import json
 import uuid
 import asyncio
 import logging
 
+from app.services.presence import presence_tracker
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -18,8 +20,13 @@ async def room_websocket(
     websocket: WebSocket, 
     room_code: str,
     token: Optional[str] = Query(None),
+    token_room: Optional[str] = Cookie(None),
 ):
     await websocket.accept()
+    # token_room участника: из ?token= или из cookie, как в get_room_access
+    # (браузер отправляет cookie и при установке WebSocket-соединения)
+    token = token or token_room
+    presence_tracker.connect(token)
 
     user_id = str(uuid.uuid4())
     
@@ -57,6 +64,7 @@ async def room_websocket(
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
+            presence_tracker.touch(token)
             
             msg_type = message.get("type")
             logger.debug(f"[WS] 📨 {user_id} → {msg_type}")
@@ -98,6 +106,8 @@ async def room_websocket(
     except Exception as e:
         logger.error(f"[WS] ❌ Ошибка для {user_id}: {e}")
     finally:
+        presence_tracker.disconnect(token)
+
         # Удаляем соединение
         if room_code in active_connections and user_id in active_connections[room_code]:
             del active_connections[room_code][user_id]
@@ -34,6 +34,34 @@ class RoomResponse(BaseModel):
     created_at: datetime = Field(..., description="Дата и время создания комнаты")
 
 
+class RoomWithStatsResponse(RoomResponse):
+    """Схема комнаты для списка владельца: со счетчиками из room_stats"""
+
+    participant_count: int = Field(0, description="Количество участников в комнате")
+    message_count: int = Field(0, description="Количество сообщений в комнате")
+    last_activity_at: datetime | None = Field(
+        None, description="Последний вход участника или сообщение"
+    )
+
+
+class RoomPage(BaseModel):
+    """Страница списка комнат владельца"""
+
+    items: list[RoomWithStatsResponse] = Field(..., description="Комнаты текущей страницы")
+    next_after: int | None = Field(
+        None, description="Значение after для следующей страницы (null - страниц больше нет)"
+    )
+
+
+class RoomUserPage(BaseModel):
+    """Страница участников комнаты"""
+
+    items: list[str] = Field(..., description="Никнеймы участников текущей страницы")
+    next_after: int | None = Field(
+        None, description="Значение after для следующей страницы (null - страниц больше нет)"
+    )
+
+
 class RoomUser(BaseModel):
     """Схема пользователя в комнате"""
 
@@ -1,5 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, Field, validator
+from app.config import settings
 from typing import Optional, List
 import html
 import re
@@ -36,6 +37,53 @@ class RoomMessageResponse(RoomMessageBase):
         from_attributes = True
 
 
+class RoomMessageSearchHit(RoomMessageResponse):
+    rank: float = Field(..., description="Релевантность (больше - лучше)")
+    headline: str = Field(
+        ..., description="Фрагменты текста с найденными словами в <mark></mark>"
+    )
+
+
+class RoomMessageSearchResponse(BaseModel):
+    items: List[RoomMessageSearchHit]
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы (null - результатов больше нет)"
+    )
+
+
+class RoomMessageBatchItem(BaseModel):
+    """
+    Сообщение в пакетной отправке. Проверяется по RoomMessageCreate
+    отдельно, чтобы ошибка в одном сообщении не отклоняла весь пакет.
+    """
+
+    text: str
+    message_type: str = Field(default="text")
+
+
+class RoomMessageBatchCreate(BaseModel):
+    messages: List[RoomMessageBatchItem] = Field(
+        ..., min_length=1, max_length=settings.ingest.batch_max_messages
+    )
+
+
+class RoomMessageBatchResult(BaseModel):
+    index: int = Field(..., description="Позиция сообщения в запросе")
+    ok: bool
+    message: Optional[RoomMessageResponse] = None
+    error: Optional[str] = None
+
+
+class RoomMessageBatchResponse(BaseModel):
+    results: List[RoomMessageBatchResult]
+    saved: int
+    failed: int
+
+
+# Поля ответа в порядке колонок, которые выбирают списочные эндпоинты
+MESSAGE_FIELDS = tuple(RoomMessageResponse.model_fields)
+
+
 class PollingResponse(BaseModel):
     messages: List[RoomMessageResponse] = []
     notifications: List[dict] = []
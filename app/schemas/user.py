@@ -1,15 +1,53 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+from collections.abc import Mapping
+from typing import Any, Optional
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
+from app.config import settings
+from app.services.avatars import avatar_url, avatar_variants
 
 
 class UserResponse(BaseModel):
     id: int = Field(..., description="Уникальный ID пользователя")
     nickname: str = Field(..., description="Имя пользователя")
     avatar: str = Field(..., description="Ссылка на аватар пользователя")
+    avatar_thumbnail: str = Field(
+        ..., description="Ссылка на маленькую копию аватара (для списков участников)"
+    )
+    avatar_variants: dict[int, dict[str, str]] = Field(
+        ..., description="Все копии аватара: {размер: {формат: ссылка}}"
+    )
     created_at: datetime = Field(..., description="Дата и время создания аккаунта")
 
+    @model_validator(mode="before")
+    @classmethod
+    def expand_avatar(cls, data: Any) -> Any:
+        """В БД хранится путь к набору копий, клиенту отдаем готовые ссылки"""
+        if isinstance(data, Mapping):
+            if "avatar_variants" in data:
+                return data
+            data = dict(data)
+        else:
+            data = {
+                "id": data.id,
+                "nickname": data.nickname,
+                "avatar": data.avatar,
+                "created_at": data.created_at,
+            }
+
+        avatar = data["avatar"]
+        data["avatar"] = avatar_url(avatar)
+        data["avatar_thumbnail"] = avatar_url(avatar, min(settings.media.avatar_sizes))
+        data["avatar_variants"] = avatar_variants(avatar)
+        return data
+
 
 class UserCreate(BaseModel):
     nickname: Optional[str]
     password: Optional[str]
+
+
+class UserPage(BaseModel):
+    items: list[UserResponse] = Field(..., description="Пользователи текущей страницы")
+    next_after: int | None = Field(
+        None, description="Значение after для следующей страницы (null - страниц больше нет)"
+    )
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.avatar_files import AvatarFile
+from app.models.users import User
+from app.utils.images import VARIANT_FORMATS, render_avatar_variants
+
+STATIC_DIR = Path(__file__).resolve().parent.parent.parent / "static"
+AVATARS_DIR = STATIC_DIR / "avatars"
+AVATARS_URL = "/static/avatars"
+
+# Недописанные загрузки и варианты лежат здесь до атомарного переименования.
+# Вне STATIC_DIR (его раздает сервер), но на той же файловой системе для os.replace
+STAGING_DIR = STATIC_DIR.parent / ".avatar_staging"
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+CHUNK_SIZE = 64 * 1024
+# Заголовки и границы частей multipart сверх самого файла
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.media.image_workers)
+    return _process_pool
+
+
+def is_variant_set(avatar: str) -> bool:
+    """Новый формат: путь к папке с копиями (/static/avatars/<sha256>), старый - к одному файлу"""
+    return avatar.startswith(AVATARS_URL + "/") and not Path(avatar).suffix
+
+
+def avatar_url(avatar: str, size: int | None = None, extension: str = "webp") -> str:
+    """Ссылка на копию аватара нужного размера (по умолчанию самую большую)"""
+    if not is_variant_set(avatar):
+        return avatar
+    size = size or max(settings.media.avatar_sizes)
+    return f"{avatar}/{size}.{extension}"
+
+
+def avatar_variants(avatar: str) -> dict[int, dict[str, str]]:
+    """Все копии аватара: {размер: {расширение: ссылка}}"""
+    return {
+        size: {
+            extension: avatar_url(avatar, size, extension)
+            for extension in VARIANT_FORMATS
+        }
+        for size in settings.media.avatar_sizes
+    }
+
+
+async def _stream_to_disk(upload: UploadFile, path: Path) -> str:
+    """Копирование загрузки на диск кусками, с ограничением размера; возвращает sha256"""
+    max_bytes = settings.media.avatar_max_bytes
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail="Файл слишком большой")
+
+    digest = hashlib.sha256()
+    written = 0
+    file = await asyncio.to_thread(open, path, "wb")
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_bytes:
+                raise HTTPException(status_code=413, detail="Файл слишком большой")
+            digest.update(chunk)
+            await asyncio.to_thread(file.write, chunk)
+    finally:
+        await asyncio.to_thread(file.close)
+
+    return digest.hexdigest()
+
+
+async def _ensure_variants(avatar_hash: str, upload_path: Path) -> None:
+    """
+    Нарезка копий в пуле процессов, если набора с таким хешем еще нет.
+    Готовая папка атомарно переносится на место: клиенты не увидят
+    наполовину записанный набор.
+    """
+    target_dir = AVATARS_DIR / avatar_hash
+    if await asyncio.to_thread(target_dir.is_dir):
+        return
+
+    staging_dir = STAGING_DIR / uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            await loop.run_in_executor(
+                _get_process_pool(),
+                render_avatar_variants,
+                str(upload_path),
+                str(staging_dir),
+                tuple(settings.media.avatar_sizes),
+            )
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise HTTPException(status_code=400, detail="Не удалось прочитать изображение")
+
+        try:
+            await asyncio.to_thread(os.replace, staging_dir, target_dir)
+        except OSError:
+            # Тот же файл параллельно загрузил кто-то еще
+            if not await asyncio.to_thread(target_dir.is_dir):
+                raise
+    finally:
+        await asyncio.to_thread(_remove_path, staging_dir)
+
+
+async def _acquire(db: AsyncSession, avatar_hash: str) -> None:
+    await db.execute(
+        insert(AvatarFile)
+        .values(hash=avatar_hash, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[AvatarFile.hash],
+            set_={"ref_count": AvatarFile.ref_count + 1},
+        )
+    )
+
+
+async def _release(db: AsyncSession, avatar: str | None) -> str | None:
+    """
+    Уменьшает счетчик ссылок; возвращает хеш, если ссылок не осталось.
+    Строка с нулевым счетчиком остается: удаляет ее remove_unreferenced
+    вместе с файлами.
+    """
+    avatar_hash = avatar_hash_from_path(avatar)
+    if avatar_hash is None:
+        return None
+
+    result = await db.execute(
+        update(AvatarFile)
+        .where(AvatarFile.hash == avatar_hash)
+        .values(ref_count=AvatarFile.ref_count - 1)
+        .returning(AvatarFile.ref_count)
+    )
+    ref_count = result.scalar_one_or_none()
+    if ref_count is None or ref_count > 0:
+        return None
+    return avatar_hash
+
+
+async def remove_unreferenced(db: AsyncSession, avatar_hash: str) -> bool:
+    """
+    Удаляет набор копий, если на него по-прежнему никто не ссылается.
+
+    Файлы удаляются под блокировкой строки: параллельный _acquire того же
+    хеша ждет commit и после него заново создает набор (_ensure_variants
+    после commit в set_user_avatar). Если _acquire успел раньше, счетчик
+    уже не нулевой и файлы остаются.
+    """
+    ref_count = await db.scalar(
+        select(AvatarFile.ref_count)
+        .where(AvatarFile.hash == avatar_hash)
+        .with_for_update()
+    )
+    if ref_count is None or ref_count > 0:
+        await db.commit()
+        return False
+
+    await asyncio.to_thread(_remove_path, AVATARS_DIR / avatar_hash)
+    await db.execute(delete(AvatarFile).where(AvatarFile.hash == avatar_hash))
+    await db.commit()
+    return True
+
+
+def avatar_hash_from_path(avatar: str | None) -> str | None:
+    if not avatar or not is_variant_set(avatar):
+        return None
+    return Path(avatar).name
+
+
+def legacy_avatar_path(avatar: str | None) -> Path | None:
+    """Файл аватара старого формата (/static/avatars/<uuid>.<ext>); он ни с кем не делится"""
+    if not avatar or is_variant_set(avatar) or not avatar.startswith(AVATARS_URL + "/"):
+        return None
+    return AVATARS_DIR / Path(avatar).name
+
+
+async def set_user_avatar(db: AsyncSession, user: User, upload: UploadFile) -> None:
+    """
+    Сохраняет аватар по хешу содержимого: одинаковые картинки хранятся один раз.
+    Старый набор удаляется только когда на него не осталось ссылок.
+
+    Транзакции на время обработки нет: текущий аватар перечитывается под
+    блокировкой строки только перед сменой ссылок.
+    """
+    file_ext = Path(upload.filename or "").suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Недопустимый формат файла")
+
+    await asyncio.to_thread(STAGING_DIR.mkdir, parents=True, exist_ok=True)
+    upload_path = STAGING_DIR / f"{uuid.uuid4().hex}.upload"
+
+    try:
+        avatar_hash = await _stream_to_disk(upload, upload_path)
+        await _ensure_variants(avatar_hash, upload_path)
+
+        new_avatar = f"{AVATARS_URL}/{avatar_hash}"
+        try:
+            # Аватар мог смениться параллельным запросом, пока шла обработка
+            await db.refresh(user, ["avatar"], with_for_update=True)
+        except InvalidRequestError:
+            raise HTTPException(status_code=404, detail="User not found")
+        if user.avatar == new_avatar:
+            await db.commit()
+            return
+
+        old_avatar = user.avatar
+        await _acquire(db, avatar_hash)
+        released_hash = await _release(db, old_avatar)
+        user.avatar = new_avatar
+        await db.commit()
+
+        # Пока ссылка не была закоммичена, набор мог удалить параллельный запрос
+        await _ensure_variants(avatar_hash, upload_path)
+
+        if released_hash:
+            await remove_unreferenced(db, released_hash)
+        legacy_path = legacy_avatar_path(old_avatar)
+        if legacy_path is not None:
+            await asyncio.to_thread(_remove_path, legacy_path)
+    finally:
+        await asyncio.to_thread(_remove_path, upload_path)
+
+
+def _remove_path(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    elif path.exists():
+        path.unlink()
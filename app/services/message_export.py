@@ -0,0 +1,119 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Literal
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.models.room_messages import RoomMessages
+from app.schemas.room_messages import MESSAGE_FIELDS
+from app.services.message_ingester import MESSAGE_COLUMNS
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_query(room_id: int, since: datetime | None):
+    """
+    Вся история комнаты по возрастанию id (индекс (room_id, id) в каждой
+    секции). since отсекает секции старше себя - инкрементальная выгрузка
+    читает только последние месяцы.
+    """
+    query = (
+        select(*MESSAGE_COLUMNS)
+        .where(RoomMessages.room_id == room_id)
+        .order_by(RoomMessages.id)
+    )
+    if since is not None:
+        query = query.where(RoomMessages.send_at > since)
+    return query
+
+
+def encode_ndjson(rows) -> bytes:
+    return b"".join(
+        orjson.dumps(
+            dict(zip(MESSAGE_FIELDS, row)),
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE,
+        )
+        for row in rows
+    )
+
+
+class CSVEncoder:
+    """csv.writer пишет в str; буфер переиспользуется между пачками строк"""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def header(self) -> bytes:
+        self._writer.writerow(MESSAGE_FIELDS)
+        return self._flush()
+
+    def encode(self, rows) -> bytes:
+        self._writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        return self._flush()
+
+    def _flush(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+async def stream_messages(
+    session_maker: async_sessionmaker,
+    room_id: int,
+    since: datetime | None,
+    format: ExportFormat,
+    compress: bool,
+) -> AsyncIterator[bytes]:
+    """
+    Тело ответа выгрузки. Строки читаются серверным курсором по chunk_rows,
+    кодируются и (при compress) сжимаются на лету: в памяти в каждый момент
+    одна пачка, сколько бы сообщений ни было в комнате.
+
+    Сессия своя (реплика, если есть): генератор работает, пока клиент
+    читает ответ, и держит соединение и транзакцию все это время. Сессию
+    зависимостей обработчик закрывает commit'ом до начала выгрузки, иначе
+    на время выгрузки было бы занято два соединения.
+    """
+    # wbits=31 - формат gzip (заголовок и crc), а не голый deflate
+    compressor = zlib.compressobj(settings.export.gzip_level, wbits=31) if compress else None
+
+    def pack(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor is not None else data
+
+    if format == "csv":
+        csv_encoder = CSVEncoder()
+        encode = csv_encoder.encode
+        header = pack(csv_encoder.header())
+        if header:
+            yield header
+    else:
+        encode = encode_ndjson
+
+    async with session_maker() as db:
+        result = await db.stream(
+            export_query(room_id, since).execution_options(
+                yield_per=settings.export.chunk_rows
+            )
+        )
+        async for rows in result.partitions():
+            chunk = pack(encode(rows))
+            if chunk:
+                yield chunk
+
+    if compressor is not None:
+        yield compressor.flush()
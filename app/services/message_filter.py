@@ -1,8 +1,48 @@
 import re
 import json
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from typing import List, Dict, NamedTuple, Tuple
 from datetime import datetime
 
+from app.services.text_normalizer import NormalizedText, folded_pattern, mask_spans, stretchable_pattern, text_normalizer
+
+
+class BannedPattern(NamedTuple):
+    """Выражения для нормализованного текста и для слов с признаками обхода (NormalizedText.folded)"""
+
+    plain: re.Pattern
+    folded: re.Pattern
+
+
+def _alternation(pattern_words: List[str], whole_words: bool) -> re.Pattern:
+    pattern = '(' + '|'.join(pattern_words) + ')'
+    if whole_words:
+        pattern = r'\b' + pattern + r'\b'
+    return re.compile(pattern, re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def compile_banned_pattern(words: Tuple[str, ...], whole_words: bool = True) -> BannedPattern | None:
+    """Выражения по нормализованным запрещенным словам (кешируются)"""
+    normalized = {text_normalizer.normalize_word(word) for word in words}
+    # Длинные слова первыми, чтобы маскировалось самое длинное совпадение
+    ordered = [word for word in sorted(normalized, key=len, reverse=True) if word]
+    if not ordered:
+        return None
+
+    return BannedPattern(
+        plain=_alternation([stretchable_pattern(word) for word in ordered], whole_words),
+        folded=_alternation([folded_pattern(word) for word in ordered], whole_words),
+    )
+
+
+def find_banned_spans(normalized: NormalizedText, pattern: BannedPattern) -> List[Tuple[int, int]]:
+    """Поиск по нормализованному тексту, диапазоны возвращаются в координатах оригинала"""
+    spans = {match.span() for match in pattern.plain.finditer(normalized.text)}
+    if normalized.folded is not None:
+        spans.update(match.span() for match in pattern.folded.finditer(normalized.folded))
+    return [normalized.original_span(*span) for span in sorted(spans)]
+
 
 class MessageFilter:
     def __init__(self):
@@ -26,26 +66,21 @@ class MessageFilter:
         # Объединяем базовые и кастомные запрещенные слова
         all_banned_words = self.base_bad_words + (custom_banned_words or [])
         
+        # Нормализуем текст один раз, маскируем по карте позиций в оригинале
+        normalized = text_normalizer.normalize(text)
+        banned_spans = []
+
         # Проверка запрещенных слов (только целые слова)
         for word in all_banned_words:
             if word.strip():  # Проверяем только непустые слова
-                # Ищем только целые слова с границами
-                pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
-                matches = pattern.finditer(filtered_text)
-                
-                found_matches = False
-                temp_text = filtered_text
-                
-                for match in matches:
-                    found_matches = True
-                    # Заменяем найденное вхождение на звездочки
-                    start, end = match.span()
-                    replacement = '*' * (end - start)
-                    temp_text = temp_text[:start] + replacement + temp_text[end:]
-                
-                if found_matches:
-                    filtered_text = temp_text
+                pattern = compile_banned_pattern((word,))
+                spans = find_banned_spans(normalized, pattern) if pattern else []
+
+                if spans:
+                    banned_spans.extend(spans)
                     violations.append(f"Запрещенное слово: '{word}'")
+
+        filtered_text = mask_spans(text, banned_spans)
         
         # Проверка спам-паттернов
         for pattern, description in self.spam_patterns:
@@ -76,25 +111,18 @@ class AdvancedMessageFilter(MessageFilter):
         # Объединяем базовые и кастомные запрещенные слова
         all_banned_words = custom_banned_words
         
-        # Создаем одно большое регулярное выражение для всех запрещенных слов
+        filtered_text = text
+
+        # Одно скомпилированное (и закешированное) выражение для всех запрещенных слов
         if all_banned_words:
-            # Экранируем и объединяем слова через | с границами слов
-            pattern_words = [re.escape(word) for word in all_banned_words if word.strip()]
-            if pattern_words:
-                # Ищем только целые слова с границами
-                combined_pattern = re.compile(r'\b(' + '|'.join(pattern_words) + r')\b', re.IGNORECASE)
+            # Ищем только целые слова с границами
+            combined_pattern = compile_banned_pattern(tuple(all_banned_words))
+            if combined_pattern:
+                spans = find_banned_spans(text_normalizer.normalize(text), combined_pattern)
+                filtered_text = mask_spans(text, spans)
                 
-                def replace_match(match):
-                    matched_text = match.group()
-                    return '*' * len(matched_text)
-                
-                filtered_text, count = combined_pattern.subn(replace_match, text)
-                
-                if count > 0:
-                    violations.append(f"Найдено {count} запрещенных слов")
-        
-        else:
-            filtered_text = text
+                if spans:
+                    violations.append(f"Найдено {len(spans)} запрещенных слов")
         
         # Проверка спам-паттернов
         for pattern, description in self.spam_patterns:
@@ -125,25 +153,18 @@ class StrictMessageFilter(MessageFilter):
         # Объединяем базовые и кастомные запрещенные слова
         all_banned_words = self.base_bad_words + (custom_banned_words or [])
         
-        # Создаем одно большое регулярное выражение для всех запрещенных слов
+        filtered_text = text
+
+        # Одно скомпилированное (и закешированное) выражение для всех запрещенных слов
         if all_banned_words:
-            # Экранируем и объединяем слова через | БЕЗ границ слов
-            pattern_words = [re.escape(word) for word in all_banned_words if word.strip()]
-            if pattern_words:
-                # Ищем в любом месте текста, даже как часть других слов
-                combined_pattern = re.compile('|'.join(pattern_words), re.IGNORECASE)
-                
-                def replace_match(match):
-                    matched_text = match.group()
-                    return '*' * len(matched_text)
+            # Ищем в любом месте текста, даже как часть других слов
+            combined_pattern = compile_banned_pattern(tuple(all_banned_words), whole_words=False)
+            if combined_pattern:
+                spans = find_banned_spans(text_normalizer.normalize(text), combined_pattern)
+                filtered_text = mask_spans(text, spans)
                 
-                filtered_text, count = combined_pattern.subn(replace_match, text)
-                
-                if count > 0:
-                    violations.append(f"Найдено {count} запрещенных слов/фрагментов")
-        
-        else:
-            filtered_text = text
+                if spans:
+                    violations.append(f"Найдено {len(spans)} запрещенных слов/фрагментов")
         
         # Проверка спам-паттернов
         for pattern, description in self.spam_patterns:
@@ -164,36 +185,16 @@ class StrictMessageFilter(MessageFilter):
         }
 
 
+def original_text_to_store(filter_result: Dict) -> str | None:
+    """
+    original_text сохраняется, только если фильтр изменил текст: у
+    большинства сообщений он совпадает с text и удваивал бы размер строки.
+    Прочитать текст до фильтрации - RoomMessages.unfiltered_text.
+    """
+    original_text = filter_result["original_text"]
+    return None if original_text == filter_result["filtered_text"] else original_text
+
+
 # Создаем экземпляр фильтра (выберите нужный вариант)
 message_filter = AdvancedMessageFilter()  # Только целые слова
 # message_filter = StrictMessageFilter()  # Целые слова и части слов
-
-# Тестирование
-if __name__ == "__main__":
-    test_cases = [
-        "тылох настоящий!",
-        "Этот человек - лох",
-        "Привет, как дела?",
-        "лохотрон и прелох",
-        "Слово лох в тексте",
-        "ТЫЛОХПЕТУХ",
-        "бля это плохо"
-    ]
-    
-    print("=== ТЕСТИРОВАНИЕ AdvancedMessageFilter (только целые слова) ===")
-    filter_test = AdvancedMessageFilter()
-    for test in test_cases:
-        result = filter_test.filter_message(test, ["лох", "бля"])
-        print(f"Оригинал: {test}")
-        print(f"Фильтр:   {result['filtered_text']}")
-        print(f"Нарушения: {result['violations']}")
-        print("-" * 50)
-    
-    print("\n=== ТЕСТИРОВАНИЕ StrictMessageFilter (целые слова и части) ===")
-    filter_strict = StrictMessageFilter()
-    for test in test_cases:
-        result = filter_strict.filter_message(test, ["лох", "бля"])
-        print(f"Оригинал: {test}")
-        print(f"Фильтр:   {result['filtered_text']}")
-        print(f"Нарушения: {result['violations']}")
-        print("-" * 50)
\ No newline at end of file
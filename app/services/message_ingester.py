@@ -0,0 +1,184 @@
+import asyncio
+import logging
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.room_messages import RoomMessages
+from app.schemas.room_messages import MESSAGE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Колонки, которые уходят клиенту (без original_text и без связей)
+MESSAGE_COLUMNS = tuple(getattr(RoomMessages, name) for name in MESSAGE_FIELDS)
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def _http_error(error: Exception) -> HTTPException:
+    """Ошибка БД -> ответ клиенту, как если бы сообщение сохранялось в запросе"""
+    if isinstance(error, IntegrityError):
+        if getattr(error.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION:
+            # Комнату удалили, пока сообщение ждало в очереди
+            return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found")
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message rejected")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def insert_messages(db: AsyncSession, values: list[dict]) -> list[dict]:
+    """
+    Вставка сообщений одним многострочным INSERT ... RETURNING (без commit).
+    Строки возвращаются в порядке values: sort_by_parameter_order
+    гарантирует соответствие даже при разбиении на несколько INSERT.
+    """
+    result = await db.execute(
+        insert(RoomMessages).returning(*MESSAGE_COLUMNS, sort_by_parameter_order=True),
+        values,
+    )
+    return [dict(zip(MESSAGE_FIELDS, row)) for row in result]
+
+
+class MessageIngester:
+    """
+    Групповое сохранение сообщений (group commit).
+
+    Обработчик кладет сообщение в очередь и ждет свою строку. Фоновая задача
+    ждет flush_interval_ms после первого сообщения (или пока не наберется
+    max_batch), затем сохраняет всю пачку одним INSERT в одной транзакции:
+    один fsync на пачку вместо одного на сообщение. Если пачку отверг
+    constraint (например, комнату удалили), она повторяется построчно,
+    и ошибку получают только запросы с плохими строками.
+    """
+
+    def __init__(self):
+        self._queue: list[tuple[dict, asyncio.Future]] = []
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self.batches = 0
+        self.messages = 0
+        self.failed_batches = 0
+        self.rejected_messages = 0
+
+    async def submit(self, values: dict) -> dict:
+        """Поставить сообщение в очередь и дождаться сохраненной строки"""
+        config = settings.ingest
+        if len(self._queue) >= config.max_queue:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((values, future))
+        self._has_items.set()
+        if len(self._queue) >= config.max_batch:
+            self._batch_full.set()
+        return await future
+
+    def _take_batch(self) -> list[tuple[dict, asyncio.Future]]:
+        max_batch = settings.ingest.max_batch
+        batch, self._queue = self._queue[:max_batch], self._queue[max_batch:]
+        if not self._queue:
+            self._has_items.clear()
+        if len(self._queue) < max_batch:
+            self._batch_full.clear()
+        return batch
+
+    @staticmethod
+    async def _begin(db: AsyncSession) -> None:
+        await db.execute(
+            text("SELECT set_config('synchronous_commit', :value, true)"),
+            {"value": settings.ingest.synchronous_commit},
+        )
+
+    async def _insert_batch(self, session_maker: async_sessionmaker, batch) -> list[dict]:
+        async with session_maker() as db:
+            await self._begin(db)
+            rows = await insert_messages(db, [values for values, _ in batch])
+            await db.commit()
+        return rows
+
+    async def _insert_each(self, session_maker: async_sessionmaker, batch) -> list[dict | Exception]:
+        """Построчно, каждая строка в своем savepoint; commit по-прежнему один"""
+        results: list[dict | Exception] = []
+        async with session_maker() as db:
+            await self._begin(db)
+            for values, _ in batch:
+                try:
+                    async with db.begin_nested():
+                        (row,) = await insert_messages(db, [values])
+                except IntegrityError as e:
+                    results.append(e)
+                else:
+                    results.append(row)
+            await db.commit()
+        return results
+
+    async def _flush(self, session_maker: async_sessionmaker, batch) -> None:
+        # Запрос, который уже отменен (клиент ушел), сохранять не нужно
+        batch = [(values, future) for values, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            try:
+                results = await self._insert_batch(session_maker, batch)
+            except IntegrityError as e:
+                if len(batch) == 1:
+                    raise
+                logger.warning(f"[INGEST] Пачка из {len(batch)} отклонена ({e.orig}), сохраняем построчно")
+                results = await self._insert_each(session_maker, batch)
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"[INGEST] Ошибка сохранения пачки из {len(batch)}: {e}")
+            results = [e] * len(batch)
+        else:
+            self.batches += 1
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self.rejected_messages += 1
+                if not future.done():
+                    future.set_exception(_http_error(result))
+                continue
+            self.messages += 1
+            if not future.done():
+                future.set_result(result)
+
+    async def run(self, session_maker: async_sessionmaker) -> None:
+        """Фоновая задача воркера"""
+        interval = settings.ingest.flush_interval_ms / 1000
+        while True:
+            await self._has_items.wait()
+            try:
+                # Даем попутчикам попасть в пачку
+                await asyncio.wait_for(self._batch_full.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush(session_maker, self._take_batch())
+
+    async def drain(self, session_maker: async_sessionmaker) -> None:
+        """Сохранить все, что осталось в очереди (при остановке воркера)"""
+        while self._queue:
+            await self._flush(session_maker, self._take_batch())
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "batches": self.batches,
+            "messages": self.messages,
+            "failed_batches": self.failed_batches,
+            "rejected_messages": self.rejected_messages,
+            "avg_batch": round(self.messages / self.batches, 1) if self.batches else 0.0,
+        }
+
+
+message_ingester = MessageIngester()
@@ -0,0 +1,64 @@
+from fastapi import HTTPException
+from sqlalchemy import Float, cast, func, literal, select, tuple_
+
+from app.models.room_messages import RoomMessages
+from app.services.message_ingester import MESSAGE_COLUMNS
+
+# Подсветка: текст уже экранирован при сохранении, теги <mark> безопасны
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5"
+
+
+def search_query_vector(query: str):
+    """Запрос пользователя в обеих конфигурациях, как и search_vector"""
+    return func.websearch_to_tsquery("russian", query).op("||")(
+        func.websearch_to_tsquery("english", query)
+    )
+
+
+def parse_cursor(cursor: str | None) -> tuple[float, int] | None:
+    """Курсор страницы: "<rank>:<id>" последнего результата предыдущей страницы"""
+    if cursor is None:
+        return None
+    try:
+        rank, message_id = cursor.split(":")
+        return float(rank), int(message_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def make_cursor(rank: float, message_id: int) -> str:
+    return f"{rank!r}:{message_id}"
+
+
+def search_messages_query(room_id: int, query: str, cursor: str | None, limit: int):
+    """
+    Поиск по сообщениям комнаты: GIN-индекс (room_id, search_vector) дает
+    совпадения, страница упорядочена по (rank, id) по убыванию. ts_headline
+    дорогой, поэтому считается во внешнем запросе только для строк страницы.
+    """
+    tsquery = search_query_vector(query)
+    # ts_rank_cd возвращает real; приводим к double, чтобы курсор сравнивался точно
+    rank = cast(func.ts_rank_cd(RoomMessages.search_vector, tsquery), Float).label("rank")
+
+    page = (
+        select(*MESSAGE_COLUMNS, rank)
+        .where(
+            RoomMessages.room_id == room_id,
+            RoomMessages.search_vector.op("@@")(tsquery),
+        )
+        .order_by(rank.desc(), RoomMessages.id.desc())
+        .limit(limit + 1)
+    )
+    after = parse_cursor(cursor)
+    if after is not None:
+        page = page.where(
+            tuple_(rank, RoomMessages.id) < tuple_(literal(after[0], Float), literal(after[1]))
+        )
+    page = page.subquery("page")
+
+    return select(
+        page,
+        func.ts_headline(
+            "russian", page.c.text, search_query_vector(query), HEADLINE_OPTIONS
+        ).label("headline"),
+    ).order_by(page.c.rank.desc(), page.c.id.desc())
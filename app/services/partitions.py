@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import re
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "room_messages"
+PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_(\d{{4}})_(\d{{2}})$")
+# Сюда попадают сообщения, для месяца которых секции еще нет (миграция b5f1d8e3a926)
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+# Колонки при переносе строк из DEFAULT-секции (search_vector вычисляется заново)
+MOVED_COLUMNS = (
+    "id, user_nickname, room_id, text, original_text, message_type, "
+    "is_filtered, filtered_reason, send_at"
+)
+# Ключ advisory lock: обслуживанием секций в каждый момент занят один воркер
+ADVISORY_LOCK_KEY = 4_517_203
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def partition_ddl(month: date) -> str:
+    """CREATE TABLE секции на месяц month (идемпотентно)"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+        f"TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    )
+
+
+def month_bounds(month: date) -> dict:
+    return {
+        "start": datetime.combine(month, time(), timezone.utc),
+        "end": datetime.combine(add_months(month, 1), time(), timezone.utc),
+    }
+
+
+@asynccontextmanager
+async def maintenance_transaction(engine: AsyncEngine):
+    """
+    Транзакция обслуживания без statement_timeout движка приложения: подсчет
+    по целой секции и DDL идут дольше любого обычного запроса. Ожидание
+    блокировок ограничивается отдельно (lock_timeout), где это нужно.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text("SET LOCAL statement_timeout = 0"))
+        yield conn
+
+
+def hot_window_start():
+    """
+    Нижняя граница send_at для горячих запросов. now() вычисляется при
+    старте выполнения, поэтому лишние секции отсекаются еще до чтения.
+    """
+    return func.now() - timedelta(hours=settings.partitions.hot_window_hours)
+
+
+class PartitionManager:
+    """Создает секции room_messages заранее и убирает старые по сроку хранения"""
+
+    def __init__(self):
+        self.created: list[str] = []
+        self.expired: list[str] = []
+        self.last_error: str | None = None
+
+    async def list_partitions(self, conn: AsyncConnection) -> list[str]:
+        result = await conn.execute(
+            text("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+                WHERE parent.relname = :parent
+                ORDER BY child.relname
+            """),
+            {"parent": PARENT_TABLE},
+        )
+        return list(result.scalars())
+
+    async def create_upcoming(self, engine: AsyncEngine, today: date) -> list[str]:
+        """
+        Секции на premake_months вперед, а также на месяцы, сообщения которых
+        уже лежат в DEFAULT-секции (задача была выключена или падала).
+        """
+        current = month_start(today)
+        created = []
+        async with maintenance_transaction(engine) as conn:
+            if not await conn.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            ):
+                return created
+
+            existing = set(await self.list_partitions(conn))
+            months = {
+                add_months(current, offset)
+                for offset in range(settings.partitions.premake_months + 1)
+            }
+            if DEFAULT_PARTITION in existing:
+                # Обычно DEFAULT-секция пуста, и запрос ничего не стоит
+                result = await conn.execute(
+                    text(f"""
+                        SELECT DISTINCT date_trunc('month', send_at AT TIME ZONE 'UTC')::date
+                        FROM {DEFAULT_PARTITION}
+                    """)
+                )
+                months.update(result.scalars())
+
+            for month in sorted(months):
+                name = partition_name(month)
+                if name in existing:
+                    continue
+                await self._create(conn, month, DEFAULT_PARTITION in existing)
+                created.append(name)
+        return created
+
+    async def _create(self, conn: AsyncConnection, month: date, has_default: bool) -> None:
+        """
+        CREATE ... PARTITION OF откажет, если строки этого месяца уже есть в
+        DEFAULT-секции: они переносятся в новую секцию в той же транзакции.
+        """
+        bounds = month_bounds(month)
+        in_default = has_default and await conn.scalar(
+            text(f"""
+                SELECT EXISTS (
+                    SELECT 1 FROM {DEFAULT_PARTITION}
+                    WHERE send_at >= :start AND send_at < :end
+                )
+            """),
+            bounds,
+        )
+        if not in_default:
+            await conn.execute(text(partition_ddl(month)))
+            return
+
+        # Запись стоит до commit: сообщение, пришедшее между копированием
+        # и удалением, иначе пропало бы. Чтение не блокируется до CREATE
+        await conn.execute(text(f"LOCK TABLE {PARENT_TABLE} IN EXCLUSIVE MODE"))
+        await conn.execute(
+            text(f"""
+                CREATE TEMP TABLE moved_messages AS
+                SELECT {MOVED_COLUMNS} FROM {DEFAULT_PARTITION}
+                WHERE send_at >= :start AND send_at < :end
+            """),
+            bounds,
+        )
+        # DELETE и INSERT идут в секции напрямую: триггеры счетчиков висят на
+        # родительской таблице и не срабатывают, message_count не меняется
+        await conn.execute(
+            text(f"DELETE FROM {DEFAULT_PARTITION} WHERE send_at >= :start AND send_at < :end"),
+            bounds,
+        )
+        await conn.execute(text(partition_ddl(month)))
+        await conn.execute(
+            text(
+                f"INSERT INTO {partition_name(month)} ({MOVED_COLUMNS}) "
+                f"SELECT {MOVED_COLUMNS} FROM moved_messages"
+            )
+        )
+        await conn.execute(text("DROP TABLE moved_messages"))
+        logger.info(f"[PARTITIONS] {partition_name(month)}: строки перенесены из {DEFAULT_PARTITION}")
+
+    async def expire_old(self, engine: AsyncEngine, today: date) -> list[str]:
+        retention = settings.partitions.retention_months
+        if retention is None:
+            return []
+
+        # Секция уходит целиком, когда весь ее месяц старше срока хранения
+        cutoff = add_months(month_start(today), -retention)
+        async with engine.connect() as conn:
+            partitions = await self.list_partitions(conn)
+
+        expired = []
+        for name in partitions:
+            match = PARTITION_NAME.match(name)
+            if not match:
+                continue
+            month = date(int(match[1]), int(match[2]), 1)
+            if add_months(month, 1) > cutoff:
+                continue
+            if await self._expire(engine, name):
+                expired.append(name)
+        return expired
+
+    async def _expire(self, engine: AsyncEngine, name: str) -> bool:
+        # В старую секцию уже никто не пишет, поэтому счетчики можно посчитать
+        # заранее, вне транзакции с блокировкой родительской таблицы
+        async with maintenance_transaction(engine) as conn:
+            result = await conn.execute(
+                text(f"SELECT room_id, count(*) FROM {name} GROUP BY room_id")
+            )
+            counts = [{"room_id": room_id, "n": n} for room_id, n in result]
+
+        async with maintenance_transaction(engine) as conn:
+            if not await conn.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            ):
+                return False
+            # DETACH берет эксклюзивную блокировку родителя: не стоим в очереди
+            # за долгими запросами, попробуем в следующий проход
+            await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            # DETACH не вызывает триггеры DELETE, счетчики правим сами
+            if counts:
+                await conn.execute(
+                    text("""
+                        UPDATE room_stats
+                        SET message_count = greatest(message_count - :n, 0)
+                        WHERE room_id = :room_id
+                    """),
+                    counts,
+                )
+            if settings.partitions.retention_action == "drop":
+                await conn.execute(text(f"DROP TABLE {name}"))
+
+        logger.info(f"[PARTITIONS] {name}: {settings.partitions.retention_action}")
+        return True
+
+    async def maintain(self, engine: AsyncEngine) -> None:
+        today = datetime.now(timezone.utc).date()
+        created = await self.create_upcoming(engine, today)
+        expired = await self.expire_old(engine, today)
+        self.created.extend(created)
+        self.expired.extend(expired)
+        if created:
+            logger.info(f"[PARTITIONS] Созданы секции: {', '.join(created)}")
+
+    async def run(self, engine: AsyncEngine) -> None:
+        """Фоновая задача воркера"""
+        while True:
+            try:
+                await self.maintain(engine)
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"[PARTITIONS] Ошибка обслуживания секций: {e}")
+            await asyncio.sleep(settings.partitions.check_interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "created": self.created[-12:],
+            "expired": self.expired[-12:],
+            "last_error": self.last_error,
+        }
+
+
+partition_manager = PartitionManager()
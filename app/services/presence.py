@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from collections import Counter
+
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.room_users import RoomUsers
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """
+    Активность участников комнат для last_seen.
+
+    Поллинг и websocket только отмечают token_room в памяти; фоновая задача
+    раз в presence_flush_seconds записывает всех отмеченных одним UPDATE на
+    пачку. Так участник, который поллит каждую секунду, дает одну запись
+    в БД за интервал, а не на каждый запрос.
+
+    Открытый websocket считается активностью сам по себе: во время звонка
+    сигнальных сообщений нет, и без этого чистильщик удалил бы участника.
+    Такие токены записываются при каждом сбросе, пока сокет открыт.
+    """
+
+    def __init__(self):
+        self._pending: set[str] = set()
+        # token -> сколько сокетов участника открыто (вкладок может быть несколько)
+        self._connected: Counter[str] = Counter()
+
+    def touch(self, token: str | None) -> None:
+        if token:
+            self._pending.add(token)
+
+    def connect(self, token: str | None) -> None:
+        if token:
+            self._connected[token] += 1
+            self._pending.add(token)
+
+    def disconnect(self, token: str | None) -> None:
+        if token:
+            self._connected[token] -= 1
+            if self._connected[token] <= 0:
+                del self._connected[token]
+
+    async def flush(self, db: AsyncSession) -> int:
+        tokens, self._pending = list(self._pending | self._connected.keys()), set()
+        batch_size = settings.maintenance.batch_size
+        for start in range(0, len(tokens), batch_size):
+            await db.execute(
+                update(RoomUsers)
+                .where(RoomUsers.token.in_(tokens[start:start + batch_size]))
+                .values(last_seen=func.now())
+            )
+            await db.commit()
+        return len(tokens)
+
+    async def run(self, session_maker: async_sessionmaker) -> None:
+        """Фоновая задача воркера"""
+        while True:
+            await asyncio.sleep(settings.maintenance.presence_flush_seconds)
+            try:
+                async with session_maker() as db:
+                    await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[PRESENCE] Ошибка записи last_seen: {e}")
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "connected": len(self._connected)}
+
+
+presence_tracker = PresenceTracker()
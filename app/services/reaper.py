@@ -0,0 +1,233 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.avatar_files import AvatarFile
+from app.models.room import Room
+from app.models.room_messages import RoomMessages
+from app.models.room_stats import RoomStats
+from app.models.room_users import RoomUsers
+from app.services.avatars import remove_unreferenced
+from app.services.notification_service import notification_service
+from app.services.room_access import room_access_cache
+from app.services.room_cache import room_cache
+from app.services.room_stats import room_stats_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Reaper:
+    """
+    Чистильщик: удаляет участников, закрывших вкладку без /rooms/leave,
+    закрывает давно неактивные комнаты, дочищает удаленные в фоне и
+    удаляет аватары, на которые не осталось ссылок.
+
+    Работает пачками по batch_size строк, каждая пачка - отдельная короткая
+    транзакция. FOR UPDATE SKIP LOCKED позволяет запускать его во всех
+    воркерах сразу: пачки не пересекаются и не ждут друг друга.
+    """
+
+    def __init__(self):
+        self.reaped_participants = 0
+        self.archived_rooms = 0
+        self.purged_rooms = 0
+        self.purged_messages = 0
+        self.purged_avatars = 0
+
+    async def reap_participants(self, db: AsyncSession) -> int:
+        """
+        Проходит room_users по первичному ключу пачками по batch_size id.
+        Индекса по last_seen нет сознательно: presence обновляет колонку у
+        всех активных участников каждые presence_flush_seconds, индекс
+        сделал бы каждое такое обновление не-HOT
+        """
+        config = settings.maintenance
+        threshold = func.now() - timedelta(seconds=config.participant_ttl_seconds)
+
+        total = 0
+        cursor = 0
+        while True:
+            chunk = (
+                select(RoomUsers.id)
+                .where(RoomUsers.id > cursor)
+                .order_by(RoomUsers.id)
+                .limit(config.batch_size)
+                .subquery()
+            )
+            chunk_end = await db.scalar(select(func.max(chunk.c.id)))
+            if chunk_end is None:
+                await db.commit()
+                break
+
+            stale = (
+                select(RoomUsers.id)
+                .where(
+                    RoomUsers.id > cursor,
+                    RoomUsers.id <= chunk_end,
+                    RoomUsers.last_seen < threshold,
+                )
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(RoomUsers)
+                .where(RoomUsers.id.in_(stale), RoomUsers.room_id == Room.id)
+                .returning(RoomUsers.token, RoomUsers.room_id, Room.code)
+            )
+            rows = result.all()
+            await db.commit()
+
+            await room_access_cache.invalidate_users(
+                db, [(token, room_code) for token, _, room_code in rows]
+            )
+            for token, room_id, _ in rows:
+                notification_service.unsubscribe_user(room_id, token)
+            for room_id in {room_id for _, room_id, _ in rows}:
+                room_stats_cache.invalidate(room_id)
+
+            total += len(rows)
+            cursor = chunk_end
+            await asyncio.sleep(config.batch_pause_seconds)
+
+        self.reaped_participants += total
+        return total
+
+    async def archive_rooms(self, db: AsyncSession) -> int:
+        config = settings.maintenance
+        # Без индекса по room_stats.last_activity_at сознательно: строка
+        # счетчиков обновляется на каждое сообщение, индекс сломал бы HOT-апдейты
+        inactive = (
+            select(Room.id)
+            .join(RoomStats, RoomStats.room_id == Room.id)
+            .where(
+                Room.is_active,
+                RoomStats.last_activity_at
+                < func.now() - timedelta(days=config.room_archive_after_days),
+                or_(Room.schedule.is_(None), Room.schedule < func.now()),
+            )
+            .order_by(Room.id)
+            .limit(config.batch_size)
+            .with_for_update(of=Room, skip_locked=True)
+            .scalar_subquery()
+        )
+
+        total = 0
+        while True:
+            # Core UPDATE минует version_id_col, версию для ETag поднимаем сами
+            result = await db.execute(
+                update(Room)
+                .where(Room.id.in_(inactive))
+                .values(is_active=False, version=Room.version + 1, updated_at=func.now())
+                .returning(Room.code)
+            )
+            codes = result.scalars().all()
+            await db.commit()
+
+            for code in codes:
+                await room_cache.invalidate(db, code)
+
+            total += len(codes)
+            if len(codes) < config.batch_size:
+                break
+            await asyncio.sleep(config.batch_pause_seconds)
+
+        self.archived_rooms += total
+        return total
+
+    async def purge_deleted_rooms(self, db: AsyncSession) -> int:
+        """
+        Дочищает комнаты, удаленные в фоне (DELETE /rooms/{id}?background=true):
+        сообщения пачками, затем саму комнату - счетчики уходят каскадом.
+        """
+        config = settings.maintenance
+        room_ids = (await db.scalars(
+            select(Room.id).where(Room.deleted_at.is_not(None)).order_by(Room.deleted_at)
+        )).all()
+        await db.commit()
+
+        total = 0
+        for room_id in room_ids:
+            batch = (
+                select(RoomMessages.id, RoomMessages.send_at)
+                .where(RoomMessages.room_id == room_id)
+                .limit(config.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            while True:
+                result = await db.execute(
+                    delete(RoomMessages)
+                    .where(tuple_(RoomMessages.id, RoomMessages.send_at).in_(batch))
+                )
+                await db.commit()
+
+                total += result.rowcount
+                if result.rowcount < config.batch_size:
+                    break
+                await asyncio.sleep(config.batch_pause_seconds)
+
+            # Остаток (пачку, которую сейчас удаляет другой воркер) удалит каскад
+            await db.execute(
+                delete(Room).where(Room.id == room_id, Room.deleted_at.is_not(None))
+            )
+            await db.commit()
+            room_stats_cache.invalidate(room_id)
+            self.purged_rooms += 1
+
+        self.purged_messages += total
+        return total
+
+    async def purge_avatars(self, db: AsyncSession) -> int:
+        """
+        Наборы копий с нулевым счетчиком: остаются после удаления
+        пользователей (счетчик уменьшает триггер) или если запрос смены
+        аватара оборвался между commit и удалением файлов.
+        """
+        hashes = (await db.scalars(
+            select(AvatarFile.hash)
+            .where(AvatarFile.ref_count <= 0)
+            .limit(settings.maintenance.batch_size)
+        )).all()
+        await db.commit()
+
+        total = 0
+        for avatar_hash in hashes:
+            total += await remove_unreferenced(db, avatar_hash)
+
+        self.purged_avatars += total
+        return total
+
+    async def run(self, session_maker: async_sessionmaker) -> None:
+        """Фоновая задача воркера"""
+        while True:
+            await asyncio.sleep(settings.maintenance.reaper_interval_seconds)
+            try:
+                async with session_maker() as db:
+                    participants = await self.reap_participants(db)
+                    rooms = await self.archive_rooms(db)
+                    messages = await self.purge_deleted_rooms(db)
+                    avatars = await self.purge_avatars(db)
+                if participants or rooms or messages or avatars:
+                    logger.info(
+                        f"[REAPER] Удалено участников: {participants}, закрыто комнат: {rooms}, "
+                        f"удалено сообщений удаленных комнат: {messages}, аватаров: {avatars}"
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[REAPER] Ошибка: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "reaped_participants": self.reaped_participants,
+            "archived_rooms": self.archived_rooms,
+            "purged_rooms": self.purged_rooms,
+            "purged_messages": self.purged_messages,
+            "purged_avatars": self.purged_avatars,
+        }
+
+
+reaper = Reaper()
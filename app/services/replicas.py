@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import logging
+
+from sqlalchemy import event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.utils.pool import InstrumentedPool
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах. Если WAL receiver подключен и все
+# полученное WAL уже применено, реплика не отстает, даже если primary давно
+# ничего не писал и pg_last_xact_replay_timestamp() старый. Без receiver
+# равенство LSN ничего не значит (нового WAL просто не приходит) - тогда
+# отставание считается по времени последней примененной транзакции.
+# NULL - реплика еще не применила ни одной транзакции, отставание неизвестно.
+# status в pg_stat_wal_receiver виден только с pg_read_all_stats (см.
+# PostgresConfig.replica_dsns): без этой роли проверка всегда идет по времени
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+             AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class Replica:
+    def __init__(self, dsn: str):
+        self.name = make_url(dsn).render_as_string(hide_password=True)
+        self.engine: AsyncEngine = create_async_engine(
+            dsn, poolclass=InstrumentedPool, **settings.postgres.engine_options()
+        )
+        self.session_maker = async_sessionmaker(
+            self.engine, autoflush=False, expire_on_commit=False
+        )
+        # До первой проверки реплика считается недоступной
+        self.healthy = False
+        self.lag: float | None = None
+        self.last_error: str | None = None
+
+        # Ошибка соединения посреди запроса сразу выводит реплику из ротации,
+        # не дожидаясь следующей проверки
+        @event.listens_for(self.engine.sync_engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.mark_down(str(context.original_exception))
+
+    def mark_down(self, error: str) -> None:
+        if self.healthy:
+            logger.warning(f"[REPLICA] {self.name} выведена из ротации: {error}")
+        self.healthy = False
+        self.last_error = error
+
+    async def check(self) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                lag = await conn.scalar(LAG_QUERY)
+        except Exception as e:
+            self.lag = None
+            self.mark_down(str(e))
+            return
+
+        if lag is None:
+            self.lag = None
+            self.mark_down("отставание неизвестно: WAL receiver не подключен, транзакции не применялись")
+            return
+        self.lag = float(lag)
+
+        max_lag = settings.postgres.replica_max_lag_seconds
+        if self.lag > max_lag:
+            self.mark_down(f"отставание {self.lag:.1f}s > {max_lag}s")
+            return
+
+        if not self.healthy:
+            logger.info(f"[REPLICA] {self.name} в ротации, отставание {self.lag:.1f}s")
+        self.healthy = True
+        self.last_error = None
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "last_error": self.last_error,
+            "pool": self.engine.pool.stats(),
+        }
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для read-only сессий: round-robin среди здоровых реплик.
+    None - здоровых реплик нет, запрос идет в primary.
+    """
+
+    def __init__(self, dsns: list[str]):
+        self.replicas = [Replica(dsn) for dsn in dsns]
+        self._next = itertools.count()
+        self.fallbacks = 0
+
+    def choose(self) -> async_sessionmaker | None:
+        if not self.replicas:
+            return None
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+            if replica.healthy:
+                return replica.session_maker
+
+        self.fallbacks += 1
+        return None
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def run_health_checks(self) -> None:
+        """Фоновая задача воркера"""
+        while True:
+            await self.check_all()
+            await asyncio.sleep(settings.postgres.replica_check_interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "fallbacks_to_primary": self.fallbacks,
+            "replicas": {replica.name: replica.stats() for replica in self.replicas},
+        }
+
+
+replica_router = ReplicaRouter(settings.postgres.replica_dsns)
@@ -0,0 +1,140 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.room import Room
+from app.models.room_users import RoomUsers
+from app.services.room_cache import ROOM_COLUMNS, RoomMeta, room_cache
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True, slots=True)
+class RoomMembership:
+    """Участник комнаты (без данных самой комнаты - они в room_cache)"""
+
+    room_user_id: int
+    user_nickname: str
+    token: str
+    room_id: int
+
+
+@dataclass(frozen=True, slots=True)
+class RoomAccess:
+    """Участник комнаты вместе с метаданными комнаты"""
+
+    room_user_id: int
+    user_nickname: str
+    token: str
+    room: RoomMeta
+
+    @property
+    def room_id(self) -> int:
+        return self.room.id
+
+    @property
+    def room_code(self) -> str:
+        return self.room.code
+
+    @property
+    def owner_id(self) -> int:
+        return self.room.owner_id
+
+    @property
+    def is_active(self) -> bool:
+        return self.room.is_active
+
+    @property
+    def schedule(self) -> datetime | None:
+        return self.room.schedule
+
+    @property
+    def created_at(self) -> datetime:
+        return self.room.created_at
+
+    @property
+    def banned_words(self) -> tuple[str, ...]:
+        return self.room.banned_words
+
+
+# Вид инвалидации в канале room_cache
+ACCESS_INVALIDATION = "access"
+
+
+class RoomAccessCache:
+    """Кеш проверки доступа: (token_room, room_code) -> RoomMembership"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Выход участника на одном воркере должен закрыть доступ на всех
+        room_cache.subscribe(ACCESS_INVALIDATION, self._on_invalidation, self._cache.clear)
+
+    async def get(self, db: AsyncSession, token: str, room_code: str) -> RoomAccess | None:
+        key = (token, room_code)
+        membership = self._cache.get(key)
+        if membership is not None:
+            # Настройки комнаты берем из room_cache: они инвалидируются отдельно
+            room = await room_cache.get(db, room_code)
+            if room is not None and room.id == membership.room_id:
+                return self._build(membership, room)
+            self._cache.pop(key)
+            return None
+
+        # Участник и комната одним запросом
+        epoch = room_cache.epoch
+        result = await db.execute(
+            select(RoomUsers.id, RoomUsers.user_nickname, RoomUsers.token, *ROOM_COLUMNS)
+            .join(Room, Room.id == RoomUsers.room_id)
+            .where(RoomUsers.token == token, Room.code == room_code)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        room = RoomMeta.from_row(row[3:], epoch)
+        room_cache.put(room)
+        membership = RoomMembership(*row[:3], room_id=room.id)
+        self._cache.set(key, membership)
+        return self._build(membership, room)
+
+    @staticmethod
+    def _build(membership: RoomMembership, room: RoomMeta) -> RoomAccess:
+        return RoomAccess(
+            room_user_id=membership.room_user_id,
+            user_nickname=membership.user_nickname,
+            token=membership.token,
+            room=room,
+        )
+
+    async def invalidate_users(self, db: AsyncSession, users: list[tuple[str, str]]) -> None:
+        """
+        Выход участников: [(token_room, room_code)]. Вызывается после commit,
+        остальные воркеры получают инвалидацию через канал room_cache.
+        """
+        if not users:
+            return
+        for token, room_code in users:
+            self._cache.pop((token, room_code))
+        if settings.cache.cross_worker_invalidation:
+            await room_cache.publish(
+                db, ACCESS_INVALIDATION, [json.dumps([token, room_code]) for token, room_code in users]
+            )
+
+    async def invalidate_user(self, db: AsyncSession, token: str, room_code: str) -> None:
+        await self.invalidate_users(db, [(token, room_code)])
+
+    def _on_invalidation(self, payload: str) -> None:
+        token, room_code = json.loads(payload)
+        self._cache.pop((token, room_code))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+room_access_cache = RoomAccessCache(
+    maxsize=settings.cache.room_access_maxsize,
+    ttl=settings.cache.room_access_ttl_seconds,
+)
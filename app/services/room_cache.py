@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+import psycopg
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.room import Room
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Канал LISTEN/NOTIFY для инвалидации кеша между воркерами. Payload -
+# room_code, либо "<kind>:<данные>" для кешей, подписанных через subscribe
+INVALIDATION_CHANNEL = "room_cache"
+
+PUBLISH_SQL = text(
+    "SELECT pg_notify(:channel, :kind || ':' || payload) "
+    "FROM unnest(CAST(:payloads AS text[])) AS payload"
+)
+
+ROOM_COLUMNS = (
+    Room.id,
+    Room.code,
+    Room.name,
+    Room.user_id,
+    Room.is_active,
+    Room.schedule,
+    Room.created_at,
+    Room.banned_words,
+    Room.version,
+)
+
+
+def parse_banned_words(raw: str | None) -> tuple[str, ...]:
+    """banned_words хранится в БД как JSON-строка"""
+    if not raw:
+        return ()
+    try:
+        words = json.loads(raw)
+    except ValueError:
+        return ()
+    if not isinstance(words, list):
+        return ()
+    return tuple(word for word in words if isinstance(word, str) and word.strip())
+
+
+@dataclass(frozen=True, slots=True)
+class RoomMeta:
+    """Редко меняющиеся данные комнаты"""
+
+    id: int
+    code: str
+    name: str
+    owner_id: int
+    is_active: bool
+    schedule: datetime | None
+    created_at: datetime
+    banned_words: tuple[str, ...]
+    # Версия строки в БД (для ETag)
+    version: int
+    # Номер инвалидации кеша, при котором запись была загружена
+    epoch: int
+
+    @classmethod
+    def from_row(cls, row, epoch: int) -> "RoomMeta":
+        (
+            id, code, name, owner_id, is_active, schedule, created_at, banned_words,
+            version,
+        ) = row
+        return cls(
+            id=id,
+            code=code,
+            name=name,
+            owner_id=owner_id,
+            is_active=is_active,
+            schedule=schedule,
+            created_at=created_at,
+            banned_words=parse_banned_words(banned_words),
+            version=version,
+            epoch=epoch,
+        )
+
+
+class RoomCache:
+    """LRU-кеш метаданных комнат: room_code -> RoomMeta"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Увеличивается при каждой инвалидации. Загрузка, во время которой
+        # случилась инвалидация, не кладет в кеш возможно устаревшие данные
+        self.epoch = 0
+        # kind -> (инвалидация по payload, очистка при переподключении LISTEN)
+        self._subscribers: dict[str, tuple[Callable[[str], None], Callable[[], None]]] = {}
+
+    async def get(self, db: AsyncSession, room_code: str) -> RoomMeta | None:
+        room = self._cache.get(room_code)
+        if room is not None:
+            return room
+
+        epoch = self.epoch
+        # Удаленная в фоне комната для всех уже не существует
+        result = await db.execute(
+            select(*ROOM_COLUMNS).where(Room.code == room_code, Room.deleted_at.is_(None))
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        room = RoomMeta.from_row(row, epoch)
+        self.put(room)
+        return room
+
+    def put(self, room: RoomMeta) -> None:
+        """Сохранить загруженную кем-то еще комнату (например, вместе с участником)"""
+        if room.epoch == self.epoch:
+            self._cache.set(room.code, room)
+
+    def invalidate_local(self, room_code: str) -> None:
+        self.epoch += 1
+        self._cache.pop(room_code)
+
+    async def invalidate(self, db: AsyncSession, room_code: str) -> None:
+        """
+        Хук для всех эндпоинтов, меняющих комнату. Вызывается после commit,
+        иначе параллельный запрос успеет закешировать старые данные.
+        """
+        self.invalidate_local(room_code)
+        if settings.cache.cross_worker_invalidation:
+            await db.execute(select(func.pg_notify(INVALIDATION_CHANNEL, room_code)))
+            await db.commit()
+
+    def subscribe(self, kind: str, invalidate: Callable[[str], None], clear: Callable[[], None]) -> None:
+        """Другой кеш получает свои инвалидации через тот же канал"""
+        self._subscribers[kind] = (invalidate, clear)
+
+    async def publish(self, db: AsyncSession, kind: str, payloads: list[str]) -> None:
+        """Инвалидации подписчика kind для других воркеров, одним запросом; вызывается после commit"""
+        await db.execute(
+            PUBLISH_SQL, {"channel": INVALIDATION_CHANNEL, "kind": kind, "payloads": payloads}
+        )
+        await db.commit()
+
+    def _on_notify(self, payload: str) -> None:
+        kind, _, data = payload.partition(":")
+        subscriber = self._subscribers.get(kind) if data else None
+        if subscriber is None:
+            self.invalidate_local(payload)
+        else:
+            subscriber[0](data)
+
+    async def listen_invalidations(self) -> None:
+        """Фоновая задача: инвалидации от других воркеров через LISTEN/NOTIFY"""
+        dsn = settings.postgres.build_dsn(drivername="postgresql")
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+                    # Пока не слушали, могли пропустить уведомления
+                    self.clear()
+                    async for notify in conn.notifies():
+                        self._on_notify(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[ROOM CACHE] Ошибка LISTEN {INVALIDATION_CHANNEL}: {e}")
+                await asyncio.sleep(5)
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._cache.clear()
+        for _, clear in self._subscribers.values():
+            clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "epoch": self.epoch}
+
+
+room_cache = RoomCache(
+    maxsize=settings.cache.room_maxsize, ttl=settings.cache.room_ttl_seconds
+)
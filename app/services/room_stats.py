@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.room_stats import RoomStats
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True, slots=True)
+class RoomCounters:
+    """Снимок строки room_stats"""
+
+    room_id: int
+    participant_count: int
+    message_count: int
+    last_message_id: int
+    last_activity_at: datetime | None
+
+
+class RoomStatsCache:
+    """
+    Копия room_stats в памяти для активных комнат: room_id -> RoomCounters.
+
+    Поллинг каждого участника раз в секунду читает счетчики, с копией
+    это один запрос к БД на комнату за ttl, а не на каждого участника.
+    Свои изменения воркер сбрасывает сразу, чужие видны не позже ttl.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, db: AsyncSession, room_id: int) -> RoomCounters:
+        counters = self._cache.get(room_id)
+        if counters is not None:
+            return counters
+
+        result = await db.execute(
+            select(
+                RoomStats.room_id,
+                RoomStats.participant_count,
+                RoomStats.message_count,
+                RoomStats.last_message_id,
+                RoomStats.last_activity_at,
+            ).where(RoomStats.room_id == room_id)
+        )
+        row = result.one_or_none()
+        # Строку создает триггер вместе с комнатой; нет строки - нет и комнаты
+        counters = RoomCounters(*row) if row else RoomCounters(room_id, 0, 0, 0, None)
+        self._cache.set(room_id, counters)
+        return counters
+
+    def invalidate(self, room_id: int) -> None:
+        """Вызывается после commit, изменившего участников или сообщения комнаты"""
+        self._cache.pop(room_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+room_stats_cache = RoomStatsCache(
+    maxsize=settings.cache.room_stats_maxsize, ttl=settings.cache.room_stats_ttl_seconds
+)
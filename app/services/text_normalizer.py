@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+import itertools
+import re
+
+
+# Невидимые символы, которыми разбивают слова внутри (мягкий перенос, zero-width)
+ZERO_WIDTH_CHARS = "\u00ad\u180e\u200b\u200c\u200d\u2060\ufeff"
+
+# Маркер символа, который выкидывается из нормализованного текста
+_DROP = "\x00"
+
+# Латиница <-> кириллица: только буквы, которые выглядят одинаково.
+# Звуковые соответствия (d/д, l/л, n/н...) сюда не входят: с ними обычные
+# английские слова совпадали с русскими запрещенными ("need" и "нед")
+HOMOGLYPHS = {
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к",
+    "m": "м", "o": "о", "p": "р", "t": "т", "x": "х", "y": "у",
+}
+
+# Цифры и символы leetspeak - для слов на кириллице и на латинице
+LEETSPEAK_CYRILLIC = {
+    "0": "о", "1": "и", "3": "з", "4": "ч", "6": "б", "7": "т", "8": "в",
+    "@": "а", "$": "с",
+}
+LEETSPEAK_LATIN = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+    "@": "a", "$": "s",
+}
+
+LATIN_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyz")
+CYRILLIC_LETTERS = frozenset("абвгдежзийклмнопрстуфхцчшщъыьэюя")
+LEET_CHARS = frozenset(LEETSPEAK_CYRILLIC) | frozenset(LEETSPEAK_LATIN)
+# Буквы, по которым видно алфавит слова (у двойников его не определить)
+LATIN_ONLY = LATIN_LETTERS - frozenset(HOMOGLYPHS)
+CYRILLIC_ONLY = CYRILLIC_LETTERS - frozenset(HOMOGLYPHS.values())
+
+# Транслит латиница -> кириллица по звучанию (буква в букву, длина не
+# меняется). Только для слов с признаками обхода (см. is_evasion): "l0h"
+# как "лох". К обычным латинским словам не применяется, иначе "mat" - это "мат"
+TRANSLIT = {
+    "a": "а", "b": "б", "c": "с", "d": "д", "e": "е", "f": "ф", "g": "г",
+    "h": "х", "i": "и", "j": "й", "k": "к", "l": "л", "m": "м", "n": "н",
+    "o": "о", "p": "п", "q": "к", "r": "р", "s": "с", "t": "т", "u": "у",
+    "v": "в", "w": "в", "x": "х", "y": "у", "z": "з",
+}
+
+TO_CYRILLIC = str.maketrans({**HOMOGLYPHS, **LEETSPEAK_CYRILLIC})
+TO_TRANSLIT = str.maketrans({**TRANSLIT, **LEETSPEAK_CYRILLIC})
+TO_LATIN = str.maketrans(
+    {**{cyrillic: latin for latin, cyrillic in HOMOGLYPHS.items()}, **LEETSPEAK_LATIN}
+)
+
+
+def build_translation_table() -> dict[int, str]:
+    """Одна таблица для str.translate: регистр, ё и невидимые символы"""
+    table: dict[int, str] = {}
+
+    # Приводим кириллицу и латиницу к нижнему регистру (длина строки не меняется)
+    for upper in "ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ":
+        table[ord(upper)] = upper.lower()
+    table[ord("ё")] = table[ord("Ё")] = "е"
+
+    for char in ZERO_WIDTH_CHARS:
+        table[ord(char)] = _DROP
+
+    return table
+
+
+def is_evasion(word: str) -> bool:
+    """Слово смешивает алфавиты или буквы с leetspeak ("сп@м", "1d10t", "мaт")"""
+    chars = set(word)
+    has_latin = not chars.isdisjoint(LATIN_LETTERS)
+    has_cyrillic = not chars.isdisjoint(CYRILLIC_LETTERS)
+    if has_latin and has_cyrillic:
+        return True
+    return (has_latin or has_cyrillic) and not chars.isdisjoint(LEET_CHARS)
+
+
+def canonical_word(word: str) -> str:
+    """
+    Слово с признаками обхода приводится к одному алфавиту - тому, чьих
+    однозначных букв в нем больше (при равенстве - кириллица). Слова
+    целиком на одном алфавите не меняются: "mat" остается "mat".
+    """
+    if not is_evasion(word):
+        return word
+
+    latin = sum(char in LATIN_ONLY for char in word)
+    cyrillic = sum(char in CYRILLIC_ONLY for char in word)
+    return word.translate(TO_LATIN if latin > cyrillic else TO_CYRILLIC)
+
+
+@dataclass(slots=True)
+class NormalizedText:
+    """Нормализованный текст и карта позиций в оригинал"""
+
+    text: str
+    # Та же длина, что у text: только слова с признаками обхода в транслите
+    # на кириллицу, остальное - пробелы. None - таких слов нет
+    folded: str | None = None
+    # starts[i]/ends[i] - границы символа text[i] в оригинальном тексте.
+    # None - позиции совпадают с оригиналом один в один
+    starts: list[int] | None = None
+    ends: list[int] | None = None
+
+    def original_span(self, start: int, end: int) -> tuple[int, int]:
+        """Перевод диапазона нормализованного текста в диапазон оригинала"""
+        if self.starts is None or start >= end:
+            return start, end
+        return self.starts[start], self.ends[end - 1]
+
+
+class TextNormalizer:
+    """
+    Нормализация текста перед поиском запрещенных слов.
+
+    Текст проходит через одну заранее собранную таблицу str.translate
+    (регистр, ё, невидимые символы), невидимые символы выкидываются с
+    картой позиций в оригинал. Затем слова со смешанными алфавитами или
+    leetspeak приводятся к одному алфавиту (длина слова не меняется).
+    Эти же слова в транслите на кириллицу попадают в folded: по нему
+    запрещенные слова ищутся отдельно, так ловится "l0h".
+
+    Повторы букв не схлопываются: растянутые слова ("лооох") ловит само
+    выражение запрещенных слов, см. stretchable_pattern.
+    """
+
+    def __init__(self):
+        self.table = build_translation_table()
+        self._word = re.compile(r"[\w@$]+")
+        self._has_latin = re.compile(r"[a-z]").search
+        self._has_cyrillic = re.compile(r"[а-я]").search
+        self._has_leet = re.compile(r"[0-9@$]").search
+
+    def normalize(self, text: str) -> NormalizedText:
+        mapped = text.translate(self.table)
+
+        starts = ends = None
+        if _DROP in mapped:
+            chars: list[str] = []
+            starts = []
+            ends = []
+            for index, char in enumerate(mapped):
+                if char == _DROP:
+                    continue
+                chars.append(char)
+                starts.append(index)
+                ends.append(index + 1)
+            mapped = "".join(chars)
+
+        # Быстрый путь: один алфавит и без leetspeak - менять нечего
+        folded = None
+        if (self._has_latin(mapped) and self._has_cyrillic(mapped)) or self._has_leet(mapped):
+            folded = self._fold(mapped)
+            mapped = self._word.sub(lambda match: canonical_word(match.group()), mapped)
+
+        return NormalizedText(mapped, folded, starts, ends)
+
+    def _fold(self, text: str) -> str | None:
+        parts = []
+        position = 0
+        for match in self._word.finditer(text):
+            word = match.group()
+            if is_evasion(word):
+                parts.append(" " * (match.start() - position))
+                parts.append(word.translate(TO_TRANSLIT))
+                position = match.end()
+        if not parts:
+            return None
+        parts.append(" " * (len(text) - position))
+        return "".join(parts)
+
+    def normalize_word(self, word: str) -> str:
+        """Нормализация запрещенного слова тем же преобразованием, что и текста"""
+        return self.normalize(word.strip()).text
+
+
+def stretchable_pattern(word: str) -> str:
+    """
+    Выражение для нормализованного запрещенного слова, которое ловит
+    растянутое написание: одиночная буква совпадает с одной или с тремя и
+    более ("лох" -> "лооох"), но не с двумя - удвоение обычно часть
+    другого слова ("pas" и "pass"). Серия из n букв - n и больше.
+    """
+    parts = []
+    for char, run in itertools.groupby(word):
+        length = len(list(run))
+        char = re.escape(char)
+        parts.append(f"{char}{{{length},}}" if length > 1 else f"{char}(?:{char}{{2,}})?")
+    return "".join(parts)
+
+
+def folded_pattern(word: str) -> str:
+    """
+    Выражение для поиска по folded: запрещенное слово в транслите, любая
+    серия букв совпадает с одной и более ("лл0х"). Там только слова с
+    признаками обхода, удвоения обычных слов ("pass") туда не попадают.
+    """
+    return "".join(f"{re.escape(char)}+" for char, _ in itertools.groupby(word.translate(TO_TRANSLIT)))
+
+
+def mask_spans(text: str, spans: list[tuple[int, int]]) -> str:
+    """Замена диапазонов оригинального текста на звездочки"""
+    if not spans:
+        return text
+
+    parts = []
+    position = 0
+    for start, end in sorted(spans):
+        start = max(start, position)
+        if start >= end:
+            continue
+        parts.append(text[position:start])
+        parts.append("*" * (end - start))
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+text_normalizer = TextNormalizer()
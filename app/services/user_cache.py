@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.users import User
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Легкая копия пользователя, не привязанная к сессии"""
+
+    id: int
+    nickname: str
+    avatar: str
+    created_at: datetime
+
+
+class UserCache:
+    """Кеш текущего пользователя: user_id -> UserSnapshot"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, db: AsyncSession, user_id: int) -> UserSnapshot | None:
+        user = self._cache.get(user_id)
+        if user is not None:
+            return user
+
+        # Только нужные колонки: без selectin-загрузки комнат пользователя
+        result = await db.execute(
+            select(User.id, User.nickname, User.avatar, User.created_at).where(
+                User.id == user_id
+            )
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+
+        user = UserSnapshot(*row)
+        self._cache.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.pop(user_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+user_cache = UserCache(
+    maxsize=settings.cache.user_maxsize, ttl=settings.cache.user_ttl_seconds
+)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User) -> None:
+    """Удаленный пользователь не должен оставаться в кеше"""
+    user_cache.invalidate(target.id)
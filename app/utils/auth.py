@@ -1,11 +1,39 @@
 # app/utils/auth.py
 
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from app.config import settings
+from app.utils.cache import TTLCache
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+def _argon2_options() -> dict:
+    """Параметры argon2 из AuthConfig; хеши со старыми параметрами считаются устаревшими"""
+    options = {}
+    if settings.auth.argon2_time_cost is not None:
+        options["argon2__default_rounds"] = settings.auth.argon2_time_cost
+        options["argon2__min_rounds"] = settings.auth.argon2_time_cost
+        options["argon2__max_rounds"] = settings.auth.argon2_time_cost
+    if settings.auth.argon2_memory_cost is not None:
+        options["argon2__memory_cost"] = settings.auth.argon2_memory_cost
+    if settings.auth.argon2_parallelism is not None:
+        options["argon2__parallelism"] = settings.auth.argon2_parallelism
+    return options
+
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", **_argon2_options())
+
+# Отдельный пул потоков под argon2: хеширование не блокирует event loop
+# и не занимает общий пул, которым пользуются остальные to_thread вызовы
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.auth.hash_workers, thread_name_prefix="argon2"
+)
+_hash_in_flight = 0
 
 
 def hash_password(password: str) -> str:
@@ -16,6 +44,77 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+async def _run_hashing(func, *args):
+    """Выполнение в пуле argon2; при переполненной очереди отвечаем 503"""
+    global _hash_in_flight
+
+    if _hash_in_flight >= settings.auth.hash_workers + settings.auth.hash_queue_limit:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    loop = asyncio.get_running_loop()
+    future = _hash_executor.submit(func, *args)
+    _hash_in_flight += 1
+    # Слот освобождается, когда поток действительно закончил: отмена запроса
+    # (клиент ушел) уже запущенный хеш не останавливает. Колбэк вызывается
+    # в потоке пула, счетчик меняем в потоке event loop
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(_release_hash_slot))
+    return await asyncio.wrap_future(future)
+
+
+def _release_hash_slot() -> None:
+    global _hash_in_flight
+    _hash_in_flight -= 1
+
+
+async def ahash_password(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def averify_password(plain: str, hashed: str) -> bool:
+    return await _run_hashing(verify_password, plain, hashed)
+
+
+async def averify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """Проверка пароля; вторым значением - новый хеш, если параметры argon2 поменялись"""
+    return await _run_hashing(pwd_context.verify_and_update, plain, hashed)
+
+
+# sha256(token) -> проверенные claims, запись живет не дольше exp самого токена
+_claims_cache = TTLCache(
+    maxsize=settings.cache.token_maxsize, ttl=settings.cache.token_ttl_seconds
+)
+
+
+def decode_token(token: str) -> dict:
+    """
+    jwt.decode с кешем проверенных claims.
+    Возвращаемый словарь общий для всех запросов - его нельзя менять.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    claims = _claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(
+        token,
+        settings.auth.secret_key.get_secret_value(),
+        algorithms=[settings.auth.algorithm],
+    )
+
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        _claims_cache.set(key, claims, ttl=exp - time.time())
+    return claims
+
+
+def token_cache_stats() -> dict:
+    return _claims_cache.stats()
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now() + timedelta(
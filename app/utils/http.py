@@ -0,0 +1,86 @@
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+
+# Публичные данные: клиент и прокси могут переиспользовать ответ несколько
+# секунд, дальше обязаны перепроверить его по ETag
+PUBLIC_REVALIDATE = "public, max-age=5, must-revalidate"
+# Данные конкретного пользователя: хранить можно, но каждый раз с перепроверкой
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag из версий строк: W/"room-12-3" """
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Сравнение с If-None-Match (для GET стандарт требует слабое сравнение)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """304 без тела; заголовки кеширования повторяют 200-й ответ"""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, cache_control)
+    return response
+
+
+class BodySizeLimitMiddleware:
+    """
+    Ограничение размера тела запроса до его разбора: {path: max_bytes}.
+
+    Multipart Starlette целиком сохраняет во временный файл еще до вызова
+    обработчика, поэтому проверка размера в самом обработчике опаздывает.
+    Запрос с большим Content-Length отклоняется сразу, а без него (chunked)
+    обрывается, как только прочитано больше лимита.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(
+                {"detail": "Файл слишком большой"},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Файл слишком большой",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
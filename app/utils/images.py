@@ -0,0 +1,40 @@
+# app/utils/images.py
+#
+# Функции из этого модуля выполняются в пуле процессов,
+# поэтому здесь нет импортов приложения (config, БД и т.п.)
+
+from pathlib import Path
+from PIL import Image, ImageOps
+
+# Защита от "бомб": картинки больше 40 Мп не декодируем
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+# Расширение файла -> параметры сохранения Pillow (webp + jpeg как запасной формат)
+VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True},
+}
+
+
+def render_avatar_variants(source: str, target_dir: str, sizes: tuple[int, ...]) -> None:
+    """Квадратные копии аватара во всех размерах и форматах"""
+    target = Path(target_dir)
+    target.mkdir(parents=True)
+
+    with Image.open(source) as original:
+        # Для JPEG декодируем сразу в уменьшенном масштабе
+        original.draft("RGB", (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(original)
+
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        for size in sorted(sizes, reverse=True):
+            variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for extension, options in VARIANT_FORMATS.items():
+                variant.save(target / f"{size}.{extension}", **options)
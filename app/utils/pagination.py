@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+DEFAULT_PAGE_SIZE = 50
+# Жесткий потолок: больше одной страницы за запрос не отдаем
+MAX_PAGE_SIZE = 200
+
+
+class CountResponse(BaseModel):
+    """Ответ в режиме count_only"""
+
+    count: int = Field(..., description="Количество записей")
+
+
+def split_page(rows: list, limit: int) -> tuple[list, bool]:
+    """Запрос выбирает limit + 1 строк: лишняя строка значит, что есть следующая страница"""
+    return rows[:limit], len(rows) > limit
+
@@ -0,0 +1,24 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Ответ по умолчанию для всего приложения.
+
+    orjson сам умеет datetime, поэтому списки можно отдавать сразу из строк
+    БД, минуя pydantic. OPT_UTC_Z - чтобы время выглядело так же, как после
+    pydantic ("...Z", а не "+00:00").
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        )
+
+
+def rows_to_dicts(fields: tuple[str, ...], rows) -> list[dict]:
+    """Строки select(*columns) -> словари для ответа, без ORM и валидации"""
+    return [dict(zip(fields, row)) for row in rows]
@@ -0,0 +1,46 @@
+# app/utils/static.py
+
+import mimetypes
+import stat
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Предсжатые копии рядом с файлом: avatar.svg.br, avatar.svg.gz
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Статика, у которой содержимое файла никогда не меняется под тем же именем
+    (имя - хеш содержимого). Отдается с вечным кешем, при наличии - предсжатой копией.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accept_encoding:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + suffix
+            )
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                media_type, _ = mimetypes.guess_type(path)
+                response = FileResponse(
+                    full_path, stat_result=stat_result, media_type=media_type
+                )
+                response.headers["Content-Encoding"] = encoding
+                response.headers["Vary"] = "Accept-Encoding"
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+                return response
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
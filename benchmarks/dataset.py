@@ -0,0 +1,376 @@
+"""
+Генератор синтетического набора данных для нагрузочных тестов.
+
+Заливает в локальную БД из .env пользователей, комнаты, участников и
+сообщения через COPY пачками по --chunk строк (каждая пачка - своя
+транзакция). Схема должна быть на последней миграции Alembic, колонки
+берутся из моделей.
+
+Форма данных:
+- размеры комнат (участники и сообщения) распределены по Парето: немного
+  огромных комнат и длинный хвост маленьких; владельцы тоже неравномерны;
+- участники приходят и уходят (--churn): id участников идут с пропусками,
+  как после /rooms/leave, а часть оставшихся давно не подавала признаков
+  жизни - работа для чистильщика;
+- сообщения на русском и английском идут по времени за --days дней до
+  --until, в комнатах со списком запрещенных слов часть сообщений
+  отфильтрована (original_text хранится только у них).
+
+Набор детерминирован при одинаковых --seed и --until (кроме хеша пароля:
+у argon2 случайная соль; пароль у всех пользователей - --password).
+Счетчики room_stats на время заливки отключаются и пересчитываются в конце.
+
+Запуск: python -m benchmarks.dataset --users 10000 --rooms 2000 --messages 10000000 --seed 42
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+import psycopg
+from alembic.config import Config as AlembicConfig
+from alembic.script import ScriptDirectory
+
+from app.config import settings
+from app.models.room import Room
+from app.models.room_messages import RoomMessages
+from app.models.room_users import RoomUsers
+from app.models.users import User
+from app.services.partitions import add_months, month_start, partition_ddl
+from app.utils.auth import hash_password
+
+ROOT = Path(__file__).parent.parent
+
+# Колонки COPY для каждой модели; id задаются явно, чтобы связать таблицы
+COLUMNS = {
+    User: ("id", "nickname", "avatar", "password_hash", "created_at", "updated_at", "version"),
+    Room: (
+        "id", "name", "code", "user_id", "is_active", "schedule", "created_at",
+        "updated_at", "version", "banned_words",
+    ),
+    RoomUsers: ("id", "user_nickname", "token", "room_id", "last_seen"),
+    RoomMessages: (
+        "id", "user_nickname", "room_id", "text", "original_text", "message_type",
+        "is_filtered", "filtered_reason", "send_at",
+    ),
+}
+
+# Триггеры счетчиков (миграция d41f6a8b2c57): на время заливки отключаются
+STATS_TRIGGERS = {
+    "rooms": ("room_stats_rooms_insert",),
+    "room_users": ("room_stats_room_users_insert", "room_stats_room_users_delete"),
+    "room_messages": ("room_stats_room_messages_insert", "room_stats_room_messages_delete"),
+}
+
+RU_WORDS = (
+    "привет", "всем", "встреча", "завтра", "сегодня", "проект", "отчет", "звонок",
+    "задача", "релиз", "сервер", "база", "данных", "обед", "вопрос", "срочно",
+    "команда", "планы", "готово", "спасибо", "посмотрю", "вечером", "созвон",
+    "презентация", "клиент", "договор", "ссылка", "документ", "правки", "ок",
+)
+EN_WORDS = (
+    "hello", "team", "meeting", "tomorrow", "today", "deploy", "review", "release",
+    "bug", "fix", "build", "merge", "request", "please", "check", "thanks", "done",
+    "call", "later", "link", "docs", "update", "issue", "branch", "ok",
+)
+BANNED_POOL = (
+    "спам", "реклама", "казино", "ставки", "кредит", "scam", "casino", "crypto",
+    "лох", "дурак", "idiot", "stupid",
+)
+CODE_ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+AVATAR = "/static/axenix.jpg"
+
+
+@dataclass(slots=True)
+class RoomPlan:
+    id: int
+    weight: float
+    banned_words: tuple[str, ...]
+
+
+class DatasetGenerator:
+    """
+    Строки для COPY. У каждой таблицы свой генератор случайных чисел от
+    --seed: изменение объема одной таблицы не меняет содержимое других.
+    """
+
+    def __init__(self, args: argparse.Namespace, base_ids: dict[str, int], password_hash: str):
+        self.args = args
+        self.base_ids = base_ids
+        self.password_hash = password_hash
+        self.until = datetime.combine(args.until, dt_time(), tzinfo=timezone.utc)
+        self.start = self.until - timedelta(days=args.days)
+
+        rng = self._rng("rooms-plan")
+        self.rooms = [
+            RoomPlan(
+                id=base_ids["rooms"] + i,
+                # Парето: несколько комнат получают большую часть трафика
+                weight=rng.paretovariate(args.skew),
+                banned_words=(
+                    tuple(rng.sample(BANNED_POOL, rng.randint(1, 6)))
+                    if rng.random() < args.banned_rooms
+                    else ()
+                ),
+            )
+            for i in range(args.rooms)
+        ]
+        self.cum_weights = list(itertools.accumulate(room.weight for room in self.rooms))
+        self.mean_weight = self.cum_weights[-1] / len(self.rooms)
+
+    def _rng(self, name: str) -> random.Random:
+        return random.Random(f"{self.args.seed}:{name}")
+
+    def nickname(self, user_index: int) -> str:
+        return f"user_{self.base_ids['users'] + user_index}"
+
+    def users(self) -> Iterator[tuple]:
+        rng = self._rng("users")
+        for i in range(self.args.users):
+            created_at = self.start - timedelta(days=rng.random() * 365)
+            yield (
+                self.base_ids["users"] + i, self.nickname(i), AVATAR, self.password_hash,
+                created_at, created_at, 1,
+            )
+
+    def owner_index(self, rng: random.Random) -> int:
+        # Куб смещает выбор к первым пользователям: у немногих много комнат
+        return int(self.args.users * rng.random() ** 3)
+
+    def room_rows(self) -> Iterator[tuple]:
+        rng = self._rng("rooms")
+        for i, room in enumerate(self.rooms):
+            created_at = self.start - timedelta(days=rng.random() * 30)
+            schedule = (
+                self.until + timedelta(days=rng.random() * 14)
+                if rng.random() < 0.1
+                else None
+            )
+            yield (
+                room.id,
+                f"Комната {i}" if rng.random() < 0.7 else f"Room {i}",
+                "".join(rng.choices(CODE_ALPHABET, k=12)),
+                self.base_ids["users"] + self.owner_index(rng),
+                rng.random() < 0.8,
+                schedule,
+                created_at,
+                created_at,
+                1,
+                json.dumps(list(room.banned_words), ensure_ascii=False),
+            )
+
+    def room_users(self) -> Iterator[tuple]:
+        rng = self._rng("room_users")
+        participant_id = self.base_ids["room_users"] - 1
+        stale_after = timedelta(seconds=settings.maintenance.participant_ttl_seconds)
+        for room in self.rooms:
+            joins = max(1, round(room.weight / self.mean_weight * self.args.participants))
+            for _ in range(joins):
+                # id расходуется и на ушедших: в таблице остаются пропуски
+                participant_id += 1
+                if rng.random() < self.args.churn:
+                    continue
+                if rng.random() < 0.3:
+                    # Закрыл вкладку без /rooms/leave
+                    last_seen = self.until - stale_after - timedelta(hours=rng.random() * 72)
+                else:
+                    last_seen = self.until - timedelta(seconds=rng.random() * stale_after.total_seconds())
+                nickname = (
+                    self.nickname(rng.randrange(self.args.users))
+                    if rng.random() < 0.6
+                    else f"Гость {rng.randrange(10_000)}"
+                )
+                yield (participant_id, nickname, f"{rng.getrandbits(48):012x}", room.id, last_seen)
+
+    def message_text(self, rng: random.Random) -> str:
+        words = RU_WORDS if rng.random() < 0.7 else EN_WORDS
+        # В основном короткие реплики, изредка длинные (уходят в TOAST)
+        length = 300 if rng.random() < 0.005 else 1 + min(int(rng.expovariate(1 / 7)), 60)
+        return " ".join(rng.choices(words, k=length))
+
+    def messages(self) -> Iterator[tuple]:
+        rng = self._rng("messages")
+        total = self.args.messages
+        span = (self.until - self.start) / max(total, 1)
+        total_weight = self.cum_weights[-1]
+        for i in range(total):
+            room = self.rooms[bisect.bisect_left(self.cum_weights, rng.random() * total_weight)]
+            text = self.message_text(rng)
+            original_text = None
+            filtered_reason = None
+            if room.banned_words and rng.random() < self.args.filtered:
+                word = rng.choice(room.banned_words)
+                original_text = f"{text} {word}"
+                text = f"{text} {'*' * len(word)}"
+                filtered_reason = "Найдено 1 запрещенных слов"
+            yield (
+                self.base_ids["room_messages"] + i,
+                self.nickname(rng.randrange(self.args.users)),
+                room.id,
+                text,
+                original_text,
+                "text",
+                original_text is not None,
+                filtered_reason,
+                # id и send_at растут вместе, как у живого чата
+                self.start + span * i,
+            )
+
+
+def alembic_head() -> str:
+    config = AlembicConfig(str(ROOT / "alembic.ini"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+async def check_schema(conn: psycopg.AsyncConnection) -> None:
+    cursor = await conn.execute("SELECT version_num FROM alembic_version")
+    row = await cursor.fetchone()
+    head = alembic_head()
+    if row is None or row[0] != head:
+        raise SystemExit(
+            f"Схема БД не на последней миграции ({row[0] if row else '-'} != {head}): "
+            "выполните alembic upgrade head"
+        )
+
+
+async def next_ids(conn: psycopg.AsyncConnection) -> dict[str, int]:
+    """Новые строки идут после существующих: можно заливать в непустую БД"""
+    ids = {}
+    for model in COLUMNS:
+        table = model.__tablename__
+        cursor = await conn.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")
+        (ids[table],) = await cursor.fetchone()
+    return ids
+
+
+async def set_stats_triggers(conn: psycopg.AsyncConnection, enabled: bool) -> None:
+    action = "ENABLE" if enabled else "DISABLE"
+    for table, triggers in STATS_TRIGGERS.items():
+        for trigger in triggers:
+            await conn.execute(f"ALTER TABLE {table} {action} TRIGGER {trigger}")
+    await conn.commit()
+
+
+async def copy_rows(conn: psycopg.AsyncConnection, model, rows: Iterator[tuple], chunk: int) -> int:
+    table = model.__tablename__
+    columns = COLUMNS[model]
+    missing = set(columns) - set(model.__table__.c.keys())
+    assert not missing, f"{table}: колонок {missing} нет в модели"
+
+    started = time.perf_counter()
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, chunk))
+        if not batch:
+            break
+        async with conn.cursor() as cursor:
+            async with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in batch:
+                    await copy.write_row(row)
+        await conn.commit()
+        total += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"{table:<14} {total:>13,} строк  {total / elapsed:>10,.0f} строк/с")
+    return total
+
+
+async def finish(conn: psycopg.AsyncConnection, first_room_id: int) -> None:
+    """Счетчики залитых комнат, последовательности id и статистика планировщика"""
+    await conn.execute(
+        """
+        INSERT INTO room_stats (room_id, participant_count, message_count, last_message_id, last_activity_at)
+        SELECT
+            r.id,
+            coalesce(u.n, 0),
+            coalesce(m.n, 0),
+            coalesce(m.max_id, 0),
+            greatest(r.created_at, m.last_at)
+        FROM rooms AS r
+        LEFT JOIN (
+            SELECT room_id, count(*) AS n FROM room_users WHERE room_id >= %(first)s GROUP BY room_id
+        ) AS u ON u.room_id = r.id
+        LEFT JOIN (
+            SELECT room_id, count(*) AS n, max(id) AS max_id, max(send_at) AS last_at
+            FROM room_messages WHERE room_id >= %(first)s GROUP BY room_id
+        ) AS m ON m.room_id = r.id
+        WHERE r.id >= %(first)s
+        ON CONFLICT (room_id) DO UPDATE SET
+            participant_count = excluded.participant_count,
+            message_count = excluded.message_count,
+            last_message_id = excluded.last_message_id,
+            last_activity_at = excluded.last_activity_at
+        """,
+        {"first": first_room_id},
+    )
+    for model in COLUMNS:
+        table = model.__tablename__
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT coalesce(max(id), 1) FROM {table}))"
+        )
+    await conn.commit()
+    for model in COLUMNS:
+        await conn.execute(f"ANALYZE {model.__tablename__}")
+    await conn.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--rooms", type=int, default=2_000)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--participants", type=float, default=8, help="Входов в комнату в среднем")
+    parser.add_argument("--churn", type=float, default=0.7, help="Доля вошедших, которые уже ушли")
+    parser.add_argument("--skew", type=float, default=1.2, help="Параметр Парето для размеров комнат (меньше - неравномернее)")
+    parser.add_argument("--banned-rooms", type=float, default=0.3, help="Доля комнат со списком запрещенных слов")
+    parser.add_argument("--filtered", type=float, default=0.03, help="Доля отфильтрованных сообщений в таких комнатах")
+    parser.add_argument("--days", type=int, default=90, help="За сколько дней распределить сообщения")
+    parser.add_argument("--until", type=date.fromisoformat, default=datetime.now(timezone.utc).date(), help="Дата последнего сообщения (YYYY-MM-DD)")
+    parser.add_argument("--seed", default="42")
+    parser.add_argument("--password", default="password", help="Пароль всех пользователей")
+    parser.add_argument("--chunk", type=int, default=100_000, help="Строк в одной транзакции COPY")
+    parser.add_argument("--truncate", action="store_true", help="Сначала очистить все таблицы (необратимо)")
+    args = parser.parse_args()
+    if args.users < 1 or args.rooms < 1:
+        parser.error("нужен хотя бы один пользователь и одна комната")
+
+    dsn = settings.postgres.build_dsn(drivername="postgresql")
+    async with await psycopg.AsyncConnection.connect(dsn) as conn:
+        await check_schema(conn)
+        if args.truncate:
+            await conn.execute("TRUNCATE room_messages, room_users, room_stats, rooms, users RESTART IDENTITY CASCADE")
+            await conn.commit()
+
+        generator = DatasetGenerator(args, await next_ids(conn), hash_password(args.password))
+
+        # Секции под весь диапазон send_at: PartitionManager создает только будущие
+        month = month_start(generator.start.date())
+        while month <= generator.until.date():
+            await conn.execute(partition_ddl(month))
+            month = add_months(month, 1)
+        await conn.commit()
+
+        started = time.perf_counter()
+        await set_stats_triggers(conn, enabled=False)
+        try:
+            await copy_rows(conn, User, generator.users(), args.chunk)
+            await copy_rows(conn, Room, generator.room_rows(), args.chunk)
+            await copy_rows(conn, RoomUsers, generator.room_users(), args.chunk)
+            await copy_rows(conn, RoomMessages, generator.messages(), args.chunk)
+        finally:
+            await conn.rollback()
+            await set_stats_triggers(conn, enabled=True)
+        await finish(conn, generator.rooms[0].id)
+        print(f"Готово за {time.perf_counter() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
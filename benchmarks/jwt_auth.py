@@ -0,0 +1,56 @@
+"""
+Накладные расходы аутентификации на запрос: jwt.decode каждый раз против кеша claims.
+
+"До" - эндпоинт с CurrentUserOptional, где токен декодировался дважды
+(get_current_user_optional -> get_current_user_from_token).
+"После" - decode_token с кешем и мемоизацией в рамках запроса.
+
+Запуск: python -m benchmarks.jwt_auth --users 1000 --requests 100000
+"""
+
+import argparse
+import random
+import time
+
+from jose import jwt
+
+from app.config import settings
+from app.utils.auth import create_access_token, decode_token, token_cache_stats
+
+
+def decode_uncached(token: str) -> dict:
+    return jwt.decode(
+        token,
+        settings.auth.secret_key.get_secret_value(),
+        algorithms=[settings.auth.algorithm],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000, help="Количество разных токенов")
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in range(args.users)]
+    rng = random.Random(0)
+    stream = [rng.choice(tokens) for _ in range(args.requests)]
+
+    started = time.perf_counter()
+    for token in stream:
+        decode_uncached(token)
+        decode_uncached(token)
+    before = (time.perf_counter() - started) / len(stream) * 1e6
+
+    started = time.perf_counter()
+    for token in stream:
+        decode_token(token)
+    after = (time.perf_counter() - started) / len(stream) * 1e6
+
+    print(f"До:    {before:8.2f} мкс/запрос (jwt.decode x2)")
+    print(f"После: {after:8.2f} мкс/запрос (кеш claims)")
+    print(f"Кеш:   {token_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
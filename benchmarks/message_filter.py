@@ -0,0 +1,263 @@
+"""
+Бенчмарк и регрессионный набор для фильтров сообщений.
+
+Запуск:
+    python -m benchmarks.message_filter                  # замеры + проверка корректности
+    python -m benchmarks.message_filter --save-baseline  # сохранить результаты как эталон
+    python -m benchmarks.message_filter --compare        # упасть при регрессии относительно эталона
+
+Новый движок достаточно добавить в ENGINES - он попадет и в замеры, и в проверку корректности.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.services.message_filter import (
+    AdvancedMessageFilter,
+    MessageFilter,
+    StrictMessageFilter,
+)
+
+ENGINES = {
+    "MessageFilter": MessageFilter,
+    "AdvancedMessageFilter": AdvancedMessageFilter,
+    "StrictMessageFilter": StrictMessageFilter,
+}
+
+BASELINE_PATH = Path(__file__).parent / "results" / "message_filter_baseline.json"
+
+RU_WORDS = [
+    "привет", "всем", "как", "дела", "начинаем", "встречу", "через", "пять", "минут",
+    "слышно", "меня", "видно", "экран", "презентация", "вопрос", "ответ", "спасибо",
+    "отлично", "давайте", "обсудим", "задачи", "на", "неделю", "ссылка", "в", "чате",
+]
+EN_WORDS = [
+    "hi", "everyone", "can", "you", "hear", "me", "sharing", "my", "screen", "now",
+    "thanks", "great", "question", "about", "the", "deadline", "lets", "sync", "later",
+    "link", "in", "chat", "agenda", "for", "today", "ok",
+]
+BANNED_SAMPLES = ["лох", "спам", "мат", "оскорбление", "дурак", "idiot", "stupid"]
+EVASIONS = ["л0х", "l0h", "ЛОООХ", "л\u200bох", "Lox", "сп@м", "$пам", "1d10t", "ДуРаК"]
+
+
+def make_ban_list(size: int, seed: int) -> list[str]:
+    """Реальные запрещенные слова + синтетические до нужного размера"""
+    rng = random.Random(seed)
+    alphabet = "абвгдежзиклмнопрстуфхцчшщэюя"
+    words = list(BANNED_SAMPLES[:size])
+    while len(words) < size:
+        words.append("".join(rng.choices(alphabet, k=rng.randint(4, 10))))
+    return words
+
+
+def make_chat_corpus(words: list[str], size: int, seed: int) -> list[str]:
+    """Обычный чат: короткие сообщения, изредка запрещенные слова"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        message = rng.choices(words, k=rng.randint(1, 20))
+        if rng.random() < 0.05:
+            message.insert(rng.randrange(len(message) + 1), rng.choice(BANNED_SAMPLES))
+        corpus.append(" ".join(message))
+    return corpus
+
+
+def make_adversarial_corpus(size: int, seed: int) -> list[str]:
+    """Попытки обхода фильтра и патологические входы для регулярок"""
+    rng = random.Random(seed)
+    generators = [
+        lambda: " ".join(rng.choices(EVASIONS + RU_WORDS, k=rng.randint(5, 30))),
+        lambda: rng.choice("аaо0") * rng.randint(50, 500),
+        lambda: "http://x.ru " * rng.randint(3, 30),
+        lambda: "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=rng.randint(20, 400))),
+        lambda: "!" * rng.randint(5, 200) + " лох",
+        lambda: " ".join(rng.choices(RU_WORDS + EN_WORDS, k=400))[:2000],
+        lambda: "\u200b".join(rng.choice(BANNED_SAMPLES)) + " ok",
+    ]
+    return [rng.choice(generators)() for _ in range(size)]
+
+
+def build_corpora(size: int) -> dict[str, list[str]]:
+    return {
+        "chat_ru": make_chat_corpus(RU_WORDS, size, seed=1),
+        "chat_en": make_chat_corpus(EN_WORDS, size, seed=2),
+        "adversarial": make_adversarial_corpus(size, seed=3),
+    }
+
+
+def run_case(engine, corpus: list[str], ban_list: list[str]) -> dict:
+    """Пропускная способность, p99 и пиковая память одного прогона"""
+    # Прогрев: компиляция и кеширование регулярок не должны попадать в замер
+    engine.filter_message(corpus[0], ban_list)
+
+    latencies = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for text in corpus:
+        before = clock()
+        engine.filter_message(text, ban_list)
+        latencies.append(clock() - before)
+    elapsed = (clock() - started) / 1e9
+
+    # Память меряем отдельным прогоном: tracemalloc сильно замедляет код
+    tracemalloc.start()
+    for text in corpus:
+        engine.filter_message(text, ban_list)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "messages_per_second": round(len(corpus) / elapsed, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1] / 1e3, 1),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(corpus_size: int, ban_list_sizes: list[int]) -> dict[str, dict]:
+    corpora = build_corpora(corpus_size)
+    results = {}
+    for engine_name, engine_cls in ENGINES.items():
+        engine = engine_cls()
+        for corpus_name, corpus in corpora.items():
+            for ban_size in ban_list_sizes:
+                key = f"{engine_name}/{corpus_name}/ban{ban_size}"
+                results[key] = run_case(engine, corpus, make_ban_list(ban_size, seed=ban_size))
+                print(
+                    f"{key:<50} {results[key]['messages_per_second']:>10} msg/s"
+                    f" p99 {results[key]['p99_us']:>9} мкс"
+                    f" peak {results[key]['peak_memory_kb']:>8} КБ"
+                )
+    return results
+
+
+# Ожидаемые результаты маскировки (бывший блок __main__ в message_filter.py)
+EXPECTED_MASKING = [
+    ("Этот человек - лох", "Этот человек - ***"),
+    ("Слово лох в тексте", "Слово *** в тексте"),
+    ("Привет, как дела?", "Привет, как дела?"),
+    ("бля это хорошо", "*** это хорошо"),
+    ("ты л0х", "ты ***"),
+    # Транслит применяется только к словам с leetspeak/смешанными алфавитами
+    ("ты l0h", "ты ***"),
+    ("ты лл0х", "ты ****"),
+    ("ЛОООХ!", "*****!"),
+    ("ты л\u200bох", "ты ****"),
+    # Слово целиком на латинице не переводится в кириллицу
+    ("Matt is here", "Matt is here"),
+    ("yoga mat", "yoga mat"),
+    ("format", "format"),
+    ("mathematics", "mathematics"),
+]
+
+# Слова из списка комнаты: (текст, запрещенные слова, ожидание).
+# Проверяются движки по целым словам - строгий маскирует и части слов
+EXPECTED_ROOM_MASKING = [
+    ("as you wish", ["ass"], "as you wish"),
+    ("Pass the salt", ["pas"], "Pass the salt"),
+    ("I need it", ["нед"], "I need it"),
+    ("you ass", ["ass"], "you ***"),
+    ("1d10t", ["idiot"], "*****"),
+    ("сп@м", ["спам"], "****"),
+    ("мaт", ["мат"], "***"),
+]
+WHOLE_WORD_ENGINES = ("MessageFilter", "AdvancedMessageFilter")
+
+
+def check_correctness() -> list[str]:
+    """Все движки должны одинаково маскировать целые запрещенные слова"""
+    errors = []
+    ban_list = MessageFilter().base_bad_words + ["лох", "бля"]
+
+    # Корпус, где запрещенные слова встречаются только целыми словами:
+    # на нем строгий фильтр (части слов) обязан совпадать с остальными
+    rng = random.Random(4)
+    corpus = [text for text, _ in EXPECTED_MASKING]
+    for _ in range(500):
+        message = rng.choices(RU_WORDS + EN_WORDS, k=rng.randint(1, 15))
+        if rng.random() < 0.3:
+            message.insert(rng.randrange(len(message) + 1), rng.choice(ban_list + EVASIONS[:5]))
+        corpus.append(" ".join(message))
+
+    engines = {name: engine_cls() for name, engine_cls in ENGINES.items()}
+    for text in corpus:
+        outputs = {
+            name: engine.filter_message(text, ban_list)["filtered_text"]
+            for name, engine in engines.items()
+        }
+        if len(set(outputs.values())) > 1:
+            errors.append(f"Движки расходятся на {text!r}: {outputs}")
+
+    for text, expected in EXPECTED_MASKING:
+        for name, engine in engines.items():
+            actual = engine.filter_message(text, ban_list)["filtered_text"]
+            if actual != expected:
+                errors.append(f"{name}: {text!r} -> {actual!r}, ожидалось {expected!r}")
+
+    for text, banned_words, expected in EXPECTED_ROOM_MASKING:
+        for name in WHOLE_WORD_ENGINES:
+            actual = engines[name].filter_message(text, banned_words)["filtered_text"]
+            if actual != expected:
+                errors.append(f"{name}: {text!r} {banned_words} -> {actual!r}, ожидалось {expected!r}")
+
+    return errors
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Регрессия: падение пропускной способности или рост p99 больше порога"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        if current["messages_per_second"] < previous["messages_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{key}: {previous['messages_per_second']} -> {current['messages_per_second']} msg/s"
+            )
+        if current["p99_us"] > previous["p99_us"] * (1 + threshold):
+            regressions.append(f"{key}: p99 {previous['p99_us']} -> {current['p99_us']} мкс")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--corpus-size", type=int, default=2000, help="Сообщений в каждом корпусе")
+    parser.add_argument("--ban-sizes", type=int, nargs="+", default=[5, 100, 1000], help="Размеры списков запрещенных слов")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Файл с эталонными результатами")
+    parser.add_argument("--save-baseline", action="store_true", help="Сохранить результаты как эталон")
+    parser.add_argument("--compare", action="store_true", help="Сравнить с эталоном и упасть при регрессии")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое ухудшение (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    errors = check_correctness()
+    for error in errors:
+        print(f"[CORRECTNESS] {error}")
+    print(f"Проверка корректности: {'FAIL' if errors else 'OK'}")
+
+    results = run_benchmarks(args.corpus_size, args.ban_sizes)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"Эталон сохранен в {args.baseline}")
+
+    regressions = []
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"Эталон {args.baseline} не найден, запустите с --save-baseline")
+            return 1
+        regressions = compare_with_baseline(results, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        print(f"Сравнение с эталоном: {'FAIL' if regressions else 'OK'}")
+
+    return 1 if errors or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
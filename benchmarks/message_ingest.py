@@ -0,0 +1,142 @@
+"""
+Нагрузочный тест записи сообщений: транзакция на сообщение против
+группового сохранения (MessageIngester).
+
+Генератор отправляет сообщения с постоянной частотой --rate, каждое как
+отдельная корутина (как параллельные запросы create_message). Меряются
+фактическая пропускная способность, задержка сохранения и число транзакций.
+Нужна живая БД из .env; тестовые пользователь и комната удаляются в конце.
+
+Запуск: python -m benchmarks.message_ingest --rate 1000 --seconds 10
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+
+from sqlalchemy import delete, insert
+
+from app.config import settings
+from app.dependencies import engine, session_maker
+from app.models.room import Room
+from app.models.room_messages import RoomMessages
+from app.models.users import User
+from app.services.message_ingester import MessageIngester, insert_messages
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)] if values else 0.0
+
+
+async def create_fixture() -> tuple[int, int]:
+    async with session_maker() as db:
+        user_id = await db.scalar(
+            insert(User)
+            .values(nickname=f"bench_{secrets.token_hex(4)}", password_hash="-")
+            .returning(User.id)
+        )
+        room_id = await db.scalar(
+            insert(Room)
+            .values(name="bench", code=f"bench-{secrets.token_hex(4)}", user_id=user_id)
+            .returning(Room.id)
+        )
+        await db.commit()
+    return user_id, room_id
+
+
+async def drop_fixture(user_id: int, room_id: int) -> None:
+    async with session_maker() as db:
+        await db.execute(delete(RoomMessages).where(RoomMessages.room_id == room_id))
+        await db.execute(delete(Room).where(Room.id == room_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+def message_values(room_id: int, i: int) -> dict:
+    text = f"Сообщение {i}: встреча завтра в 10:00"
+    return {
+        "user_nickname": "bench",
+        "room_id": room_id,
+        "text": text,
+        "original_text": None,
+        "message_type": "text",
+        "is_filtered": False,
+        "filtered_reason": None,
+    }
+
+
+async def direct_write(values: dict) -> None:
+    # Как create_message без группового сохранения: своя транзакция на сообщение
+    async with session_maker() as db:
+        await insert_messages(db, [values])
+        await db.commit()
+
+
+async def run(write, room_id: int, rate: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await write(message_values(room_id, i))
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    total = int(rate * seconds)
+    for i in range(total):
+        # Постоянная частота: i-е сообщение уходит в момент i / rate
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "saved": len(latencies),
+        "messages_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=1000, help="Сообщений в секунду")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    user_id, room_id = await create_fixture()
+    try:
+        result = await run(direct_write, room_id, args.rate, args.seconds)
+        print(f"{'transaction per message':<26} {result} transactions={result['saved']}")
+
+        ingester = MessageIngester()
+        flusher = asyncio.create_task(ingester.run(session_maker))
+        result = await run(ingester.submit, room_id, args.rate, args.seconds)
+        await ingester.drain(session_maker)
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        stats = ingester.stats()
+        print(
+            f"{'group commit':<26} {result} transactions={stats['batches']} "
+            f"avg_batch={stats['avg_batch']} "
+            f"(interval={settings.ingest.flush_interval_ms}ms, "
+            f"synchronous_commit={settings.ingest.synchronous_commit})"
+        )
+    finally:
+        await drop_fixture(user_id, room_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,202 @@
+"""
+Нагрузочный тест полнотекстового поиска по сообщениям комнаты.
+
+Засевает --rows сообщений (по умолчанию 10M) в --rooms тестовых комнат
+за последние --days дней: текст собирается из частых слов, редкое слово
+встречается примерно в одном сообщении из 10 000. setseed делает набор
+воспроизводимым. Затем для каждого запроса из QUERIES меряются p50/p99
+первой страницы и страницы по курсору - ровно тот запрос, что выполняет
+GET /rooms/{code}/messages/search.
+
+Нужна живая БД из .env с примененными миграциями. Тестовые данные
+удаляются в конце, если не передан --keep (засев 10M строк занимает
+минуты, с --keep его можно не повторять, передав --skip-seed).
+
+Запуск: python -m benchmarks.message_search --rows 10000000 --rooms 10
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select, text
+
+from app.dependencies import engine, session_maker
+from app.models.room import Room
+from app.models.room_messages import RoomMessages
+from app.models.users import User
+from app.services.message_search import make_cursor, search_messages_query
+from app.services.partitions import PARENT_TABLE, add_months, month_start, partition_ddl
+
+FIXTURE_PREFIX = "bench-search-"
+SEED_CHUNK = 500_000
+
+COMMON_WORDS = [
+    "встреча", "завтра", "проект", "отчет", "звонок", "задача", "релиз",
+    "сервер", "база", "обед", "вопрос", "срочно", "команда", "планы",
+    "meeting", "deploy", "review", "release", "bug", "fix", "build", "merge",
+]
+RARE_WORD = "кракен"
+
+QUERIES = {
+    "common": "встреча",
+    "rare": RARE_WORD,
+    "phrase": '"встреча завтра"',
+    "exclude": "релиз -bug",
+    "english": "deploy review",
+}
+
+SEED_SQL = text(f"""
+    INSERT INTO {PARENT_TABLE}
+        (user_nickname, room_id, text, message_type, is_filtered, send_at)
+    SELECT 'bench', msg.room_id, msg.text, 'text', false, msg.send_at
+    FROM (
+        SELECT
+            (CAST(:room_ids AS integer[]))[1 + g % cardinality(CAST(:room_ids AS integer[]))] AS room_id,
+            array_to_string(ARRAY(
+                SELECT (CAST(:words AS text[]))[1 + floor(random() * cardinality(CAST(:words AS text[])))::int]
+                FROM generate_series(1, 4 + g % 12)
+            ), ' ')
+            || CASE WHEN random() < 0.0001 THEN ' ' || :rare ELSE '' END AS text,
+            now() - random() * make_interval(days => :days) AS send_at
+        FROM generate_series(:start, :stop) AS g
+    ) AS msg
+""")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)] if values else 0.0
+
+
+async def ensure_partitions(days: int) -> None:
+    """Засев уходит в прошлое, а PartitionManager создает только будущие секции"""
+    today = datetime.now(timezone.utc).date()
+    month = month_start(today - timedelta(days=days))
+    async with engine.begin() as conn:
+        while month <= today:
+            await conn.execute(text(partition_ddl(month)))
+            month = add_months(month, 1)
+
+
+async def find_fixture() -> tuple[int | None, list[int]]:
+    async with session_maker() as db:
+        rows = (await db.execute(
+            select(Room.id, Room.user_id)
+            .where(Room.code.startswith(FIXTURE_PREFIX))
+            .order_by(Room.id)
+        )).all()
+    if not rows:
+        return None, []
+    return rows[0].user_id, [row.id for row in rows]
+
+
+async def create_fixture(rooms: int) -> tuple[int, list[int]]:
+    async with session_maker() as db:
+        user_id = await db.scalar(
+            insert(User)
+            .values(nickname=f"bench_{secrets.token_hex(4)}", password_hash="-")
+            .returning(User.id)
+        )
+        room_ids = list(await db.scalars(
+            insert(Room).returning(Room.id, sort_by_parameter_order=True),
+            [
+                {"name": "bench", "code": f"{FIXTURE_PREFIX}{secrets.token_hex(4)}", "user_id": user_id}
+                for _ in range(rooms)
+            ],
+        ))
+        await db.commit()
+    return user_id, room_ids
+
+
+async def drop_fixture(user_id: int, room_ids: list[int]) -> None:
+    async with session_maker() as db:
+        await db.execute(delete(RoomMessages).where(RoomMessages.room_id.in_(room_ids)))
+        await db.execute(delete(Room).where(Room.id.in_(room_ids)))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+async def seed(room_ids: list[int], rows: int, days: int, seed_value: float) -> None:
+    await ensure_partitions(days)
+    async with engine.connect() as conn:
+        # random() детерминирован в пределах соединения после setseed
+        await conn.execute(text("SELECT setseed(:seed)"), {"seed": seed_value})
+        for start in range(1, rows + 1, SEED_CHUNK):
+            stop = min(start + SEED_CHUNK - 1, rows)
+            started = time.perf_counter()
+            await conn.execute(SEED_SQL, {
+                "room_ids": room_ids, "words": COMMON_WORDS, "rare": RARE_WORD,
+                "days": days, "start": start, "stop": stop,
+            })
+            await conn.commit()
+            print(f"засеяно {stop:>11,} / {rows:,} ({time.perf_counter() - started:.1f}s)")
+        await conn.execute(text(f"ANALYZE {PARENT_TABLE}"))
+        await conn.commit()
+
+
+async def measure(room_ids: list[int], query: str, limit: int, repeats: int) -> dict:
+    first_page: list[float] = []
+    next_page: list[float] = []
+    hits = 0
+
+    for i in range(repeats):
+        room_id = room_ids[i % len(room_ids)]
+        async with session_maker() as db:
+            started = time.perf_counter()
+            rows = (await db.execute(
+                search_messages_query(room_id, query, None, limit)
+            )).mappings().all()
+            first_page.append(time.perf_counter() - started)
+            hits += min(len(rows), limit)
+
+            if len(rows) > limit:
+                cursor = make_cursor(rows[limit - 1]["rank"], rows[limit - 1]["id"])
+                started = time.perf_counter()
+                await db.execute(search_messages_query(room_id, query, cursor, limit))
+                next_page.append(time.perf_counter() - started)
+
+    return {
+        "avg_hits": round(hits / repeats, 1),
+        "p50_ms": round(percentile(first_page, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(first_page, 0.99) * 1000, 2),
+        "next_p50_ms": round(percentile(next_page, 0.5) * 1000, 2) if next_page else None,
+        "next_p99_ms": round(percentile(next_page, 0.99) * 1000, 2) if next_page else None,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--days", type=int, default=60, help="За сколько дней распределить сообщения")
+    parser.add_argument("--seed", type=float, default=0.42, help="setseed для воспроизводимого набора")
+    parser.add_argument("--limit", type=int, default=20, help="Размер страницы")
+    parser.add_argument("--repeats", type=int, default=50, help="Повторов каждого запроса")
+    parser.add_argument("--keep", action="store_true", help="Не удалять тестовые данные")
+    parser.add_argument("--skip-seed", action="store_true", help="Использовать данные, оставленные --keep")
+    args = parser.parse_args()
+
+    if args.skip_seed:
+        user_id, room_ids = await find_fixture()
+        if not room_ids:
+            parser.error("нет данных от предыдущего запуска с --keep")
+    else:
+        user_id, room_ids = await create_fixture(args.rooms)
+
+    try:
+        if not args.skip_seed:
+            await seed(room_ids, args.rows, args.days, args.seed)
+        for name, query in QUERIES.items():
+            result = await measure(room_ids, query, args.limit, args.repeats)
+            print(f"{name:<10} {query!r:<20} {result}")
+    finally:
+        if not args.keep:
+            await drop_fixture(user_id, room_ids)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Бенчмарк сериализации списка сообщений (ответ poll_messages).
+
+Старый путь: ORM-объекты -> RoomMessageResponse.from_orm -> PollingResponse ->
+повторная валидация по response_model -> json.dumps (стандартный JSONResponse).
+Новый путь: кортежи select(*MESSAGE_COLUMNS) -> словари -> orjson.
+
+Запуск: python -m benchmarks.message_serialization --messages 1000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models.room_messages import RoomMessages
+from app.schemas.room_messages import MESSAGE_FIELDS, PollingResponse, RoomMessageResponse
+from app.utils.serialization import FastJSONResponse, rows_to_dicts
+
+polling_adapter = TypeAdapter(PollingResponse)
+
+
+def build_rows(count: int) -> list[tuple]:
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(1, count + 1):
+        values = {
+            "id": i,
+            "user_nickname": f"user{i % 50}",
+            "room_id": 1,
+            "text": f"Сообщение номер {i}: встреча завтра в 10:00",
+            "message_type": "text",
+            "is_filtered": i % 20 == 0,
+            "filtered_reason": "Обнаружены запрещенные слова" if i % 20 == 0 else None,
+            "send_at": started + timedelta(seconds=i, microseconds=i * 7),
+        }
+        rows.append(tuple(values[name] for name in MESSAGE_FIELDS))
+    return rows
+
+
+def build_orm(rows: list[tuple]) -> list[RoomMessages]:
+    return [
+        RoomMessages(**dict(zip(MESSAGE_FIELDS, row)))
+        for row in rows
+    ]
+
+
+def old_path(messages: list[RoomMessages]) -> bytes:
+    response = PollingResponse(
+        messages=[RoomMessageResponse.from_orm(msg) for msg in messages],
+        notifications=[],
+        user_count=10,
+        last_message_id=messages[-1].id,
+        has_more=False,
+    )
+    # Что делает FastAPI с response_model: валидирует еще раз и дампит в json-режиме
+    content = polling_adapter.dump_python(
+        polling_adapter.validate_python(response, from_attributes=True), mode="json"
+    )
+    return JSONResponse(content).body
+
+
+def new_path(rows: list[tuple]) -> bytes:
+    messages = rows_to_dicts(MESSAGE_FIELDS, rows)
+    return FastJSONResponse({
+        "messages": messages,
+        "notifications": [],
+        "user_count": 10,
+        "last_message_id": messages[-1]["id"],
+        "has_more": False,
+    }).body
+
+
+def measure(func, payload, repeat: int) -> float:
+    """Лучшее время одного вызова в миллисекундах"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = build_rows(args.messages)
+    messages = build_orm(rows)
+
+    old_body, new_body = old_path(messages), new_path(rows)
+    if json.loads(old_body) != json.loads(new_body):
+        raise SystemExit("Ответы старого и нового пути отличаются")
+
+    old_ms = measure(old_path, messages, args.repeat)
+    new_ms = measure(new_path, rows, args.repeat)
+    print(f"{'old (ORM + pydantic + json)':<30} {old_ms:8.2f} ms  {len(old_body)} bytes")
+    print(f"{'new (rows + orjson)':<30} {new_ms:8.2f} ms  {len(new_body)} bytes")
+    print(f"ускорение: x{old_ms / new_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
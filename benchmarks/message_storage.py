@@ -0,0 +1,122 @@
+"""
+Размер хранения сообщений: original_text в каждой строке против
+original_text только у отфильтрованных сообщений.
+
+Обе схемы заполняются одним и тем же набором (setseed): --rows сообщений,
+доля --long длинных (больше порога TOAST ~2 КБ), доля --filtered
+сообщений, которые фильтр изменил. Таблицы временные, с колонками
+room_messages; секции и индексы не участвуют - сравнивается только куча
+и TOAST. Нужна живая БД из .env.
+
+Запуск: python -m benchmarks.message_storage --rows 1000000
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+WORDS = [
+    "встреча", "завтра", "проект", "отчет", "звонок", "задача", "релиз",
+    "сервер", "meeting", "deploy", "review", "release", "bug", "fix",
+]
+
+LAYOUTS = {
+    # До миграции e1f4c7a29b83: копия текста в каждой строке
+    "duplicated": "msg.original",
+    # После: только если фильтр изменил текст
+    "deduplicated": "CASE WHEN msg.filtered THEN msg.original ELSE NULL END",
+}
+
+SEED_SQL = """
+    INSERT INTO {table} (id, user_nickname, room_id, text, original_text, message_type, is_filtered, send_at)
+    SELECT msg.g, 'bench', 1 + msg.g % 1000, msg.text, {original_text}, 'text', msg.filtered, now()
+    FROM (
+        SELECT
+            g,
+            CASE WHEN filtered THEN regexp_replace(original, '^\\S+', '***') ELSE original END AS text,
+            original,
+            filtered
+        FROM (
+            SELECT
+                g,
+                array_to_string(ARRAY(
+                    SELECT (CAST(:words AS text[]))[1 + floor(random() * cardinality(CAST(:words AS text[])))::int]
+                    FROM generate_series(1, CASE WHEN random() < :long THEN 400 ELSE 4 + g % 12 END)
+                ), ' ') AS original,
+                random() < :filtered AS filtered
+            FROM generate_series(1, :rows) AS g
+        ) AS source
+    ) AS msg
+"""
+
+SIZES_SQL = """
+    SELECT
+        pg_relation_size(CAST(:table AS regclass)) AS heap_bytes,
+        coalesce(pg_total_relation_size(reltoastrelid), 0) AS toast_bytes,
+        pg_total_relation_size(CAST(:table AS regclass)) AS total_bytes,
+        (SELECT avg(pg_column_size(t.*)) FROM {table} AS t) AS avg_row_bytes
+    FROM pg_class WHERE oid = CAST(:table AS regclass)
+"""
+
+
+def megabytes(value: int) -> float:
+    return round(value / 1024 / 1024, 1)
+
+
+async def measure(layout: str, original_text: str, args) -> dict:
+    table = f"bench_storage_{layout}"
+    async with engine.connect() as conn:
+        await conn.execute(text(
+            f"CREATE TEMP TABLE {table} "
+            "(LIKE room_messages INCLUDING DEFAULTS EXCLUDING GENERATED)"
+        ))
+        # search_vector к сравнению не относится; NOT NULL мог остаться,
+        # если миграция еще не применена
+        await conn.execute(text(
+            f"ALTER TABLE {table} DROP COLUMN search_vector, "
+            "ALTER COLUMN original_text DROP NOT NULL"
+        ))
+        # Одинаковый набор для обеих схем
+        await conn.execute(text("SELECT setseed(:seed)"), {"seed": args.seed})
+        await conn.execute(
+            text(SEED_SQL.format(table=table, original_text=original_text)),
+            {"words": WORDS, "rows": args.rows, "long": args.long, "filtered": args.filtered},
+        )
+        await conn.commit()
+        row = (await conn.execute(text(SIZES_SQL.format(table=table)), {"table": table})).one()
+        await conn.execute(text(f"DROP TABLE {table}"))
+        await conn.commit()
+
+    return {
+        "heap_mb": megabytes(row.heap_bytes),
+        "toast_mb": megabytes(row.toast_bytes),
+        "total_mb": megabytes(row.total_bytes),
+        "avg_row_bytes": round(float(row.avg_row_bytes), 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--filtered", type=float, default=0.02, help="Доля сообщений, измененных фильтром")
+    parser.add_argument("--long", type=float, default=0.01, help="Доля длинных сообщений (уходят в TOAST)")
+    parser.add_argument("--seed", type=float, default=0.42, help="setseed для воспроизводимого набора")
+    args = parser.parse_args()
+
+    try:
+        results = {layout: await measure(layout, expr, args) for layout, expr in LAYOUTS.items()}
+    finally:
+        await engine.dispose()
+
+    for layout, result in results.items():
+        print(f"{layout:<14} {result}")
+    before, after = results["duplicated"], results["deduplicated"]
+    print(f"{'saved':<14} {round(100 * (1 - after['total_mb'] / before['total_mb']), 1)}% total, "
+          f"{round(100 * (1 - after['avg_row_bytes'] / before['avg_row_bytes']), 1)}% per row")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
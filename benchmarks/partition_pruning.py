@@ -0,0 +1,76 @@
+"""
+Проверка, что горячие запросы к room_messages читают только последние секции.
+
+Для каждого запроса из HOT_QUERIES строится план (EXPLAIN, без выполнения)
+и собираются секции, которые в нем остались после отсечения. Секции вне
+окна hot_window_hours - ошибка, скрипт завершается с кодом 1 (годится для CI).
+Нужна живая БД из .env с примененными миграциями.
+
+Запуск: python -m benchmarks.partition_pruning
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.dependencies import engine, session_maker
+from app.routers.rooms import hot_window_first_id_query, new_messages_query
+from app.services.partitions import PARTITION_NAME, month_start, partition_name
+
+HOT_QUERIES = {
+    "poll_messages": lambda: new_messages_query(room_id=1, last_message_id=0),
+    "poll_window_start": lambda: hot_window_first_id_query(room_id=1),
+}
+
+
+def scanned_partitions(plan: dict) -> set[str]:
+    found = set()
+    relation = plan.get("Relation Name")
+    if relation and PARTITION_NAME.match(relation):
+        found.add(relation)
+    for child in plan.get("Plans", []):
+        found |= scanned_partitions(child)
+    return found
+
+
+def expected_partitions() -> set[str]:
+    now = datetime.now(timezone.utc)
+    window_start = now - timedelta(hours=settings.partitions.hot_window_hours)
+    return {partition_name(month_start(window_start.date())), partition_name(month_start(now.date()))}
+
+
+async def explain(query) -> dict:
+    async with session_maker() as db:
+        conn = await db.connection()
+        compiled = query.compile(dialect=conn.dialect)
+        raw = await conn.get_raw_connection()
+        cursor = await raw.driver_connection.execute(
+            "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+        )
+        (plan,) = await cursor.fetchone()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def main() -> int:
+    expected = expected_partitions()
+    failed = False
+    try:
+        for name, build in HOT_QUERIES.items():
+            scanned = scanned_partitions(await explain(build()))
+            extra = scanned - expected
+            status = "ok" if not extra else "FAIL"
+            print(f"{name:<16} {status:<5} секции в плане: {', '.join(sorted(scanned)) or '-'}")
+            if extra:
+                print(f"{'':<22} лишние: {', '.join(sorted(extra))}")
+                failed = True
+    finally:
+        await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
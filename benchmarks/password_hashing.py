@@ -0,0 +1,89 @@
+"""
+Нагрузочный тест логина: argon2 в event loop против выделенного пула потоков.
+
+Параллельно с логинами крутится "остальное приложение" - корутина, которая
+каждые 10 мс просыпается и меряет, насколько опоздала. Ее p99 показывает,
+сколько ждут websocket'ы и поллинг, пока считается argon2.
+
+Запуск: python -m benchmarks.password_hashing --logins 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import HTTPException
+
+from app.utils.auth import averify_and_update, hash_password, verify_password
+
+TICK_SECONDS = 0.01
+
+
+async def heartbeat(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def sync_login(password: str, hashed: str) -> None:
+    # Как было: argon2 прямо в обработчике
+    verify_password(password, hashed)
+
+
+async def async_login(password: str, hashed: str) -> None:
+    await averify_and_update(password, hashed)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)] if values else 0.0
+
+
+async def run(login, logins: int, concurrency: int, hashed: str) -> dict:
+    lags: list[float] = []
+    latencies: list[float] = []
+    rejected = 0
+    stop = asyncio.Event()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_login():
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await login("password", hashed)
+            except HTTPException:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    return {
+        "logins_per_second": round(len(latencies) / elapsed, 1),
+        "login_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "loop_lag_p99_ms": round(percentile(lags, 0.99) * 1000, 1),
+        "rejected_503": rejected,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    hashed = hash_password("password")
+    for name, login in (("sync (event loop)", sync_login), ("async (argon2 pool)", async_login)):
+        result = await run(login, args.logins, args.concurrency, hashed)
+        print(f"{name:<22} {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
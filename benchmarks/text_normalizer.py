@@ -0,0 +1,72 @@
+"""
+Бенчмарк нормализации текста перед фильтрацией.
+
+Запуск: python -m benchmarks.text_normalizer
+"""
+
+import random
+import re
+import time
+
+from app.services.message_filter import AdvancedMessageFilter
+from app.services.text_normalizer import text_normalizer
+
+WORDS = [
+    "привет", "как", "дела", "встреча", "завтра", "в", "10:00", "hello", "team",
+    "meeting", "starts", "now", "ссылка", "на", "презентацию", "отлично", "ok",
+]
+EVASIONS = ["л0х", "l0h", "ЛОООХ", "л\u200bох", "Lox", "сп@м", "spaaam"]
+BANNED_WORDS = ["лох", "спам", "мат", "оскорбление"]
+
+
+def build_corpus(size: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(WORDS, k=rng.randint(3, 25))
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), rng.choice(EVASIONS))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def measure(func, corpus: list[str], repeat: int = 5) -> float:
+    """Лучшее время на одно сообщение в микросекундах"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus) * 1e6
+
+
+def main():
+    corpus = build_corpus(10_000)
+    message_filter = AdvancedMessageFilter()
+
+    # Старый подход: регулярка по точному написанию, без нормализации
+    exact_pattern = re.compile(
+        r"\b(" + "|".join(map(re.escape, BANNED_WORDS)) + r")\b", re.IGNORECASE
+    )
+
+    results = {
+        "exact regex (без нормализации)": measure(exact_pattern.findall, corpus),
+        "normalize": measure(text_normalizer.normalize, corpus),
+        "AdvancedMessageFilter.filter_message": measure(
+            lambda text: message_filter.filter_message(text, BANNED_WORDS), corpus
+        ),
+    }
+
+    caught_exact = sum(bool(exact_pattern.search(text)) for text in corpus)
+    caught_filter = sum(
+        not message_filter.filter_message(text, BANNED_WORDS)["is_clean"] for text in corpus
+    )
+
+    for name, value in results.items():
+        print(f"{name:<40} {value:8.2f} мкс/сообщение")
+    print(f"Поймано точной регуляркой: {caught_exact}, фильтром с нормализацией: {caught_filter}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+#!/bin/sh
+# Разрешаем реплике подключаться по протоколу репликации (только для локальной проверки)
+set -e
+echo "host replication all all ${POSTGRES_HOST_AUTH_METHOD:-scram-sha-256}" >> "$PGDATA/pg_hba.conf"
+# Проверке отставания нужен pg_stat_wal_receiver.status (см. app/services/replicas.py).
+# Здесь приложение ходит пользователем образа: он суперпользователь, и GRANT только
+# фиксирует требование. Отдельному пользователю приложения роль выдается так же.
+psql -v ON_ERROR_STOP=1 -U "$POSTGRES_USER" -d "$POSTGRES_DB" \
+    -c "GRANT pg_read_all_stats TO \"$POSTGRES_USER\""